@@ -3,5 +3,5 @@ from flask import Blueprint
 # Create a Blueprint for authentication-related routes
 api_bp = Blueprint("api", __name__)
 
-# Import encode and decode routes from the api module
-from api import encode, decode
+# Import encode, decode, bulk, alias, link, stats and metrics routes from the api module
+from api import encode, decode, bulk, aliases, links, stats, metrics
@@ -0,0 +1,35 @@
+from functools import wraps
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+import os
+
+# Usernames allowed to use the admin endpoints (comma-separated). Signup is open to
+# anyone, so there is no default: the admin endpoints are disabled until configured.
+ADMIN_USERNAMES = frozenset(
+    username.strip()
+    for username in os.getenv("ADMIN_USERNAMES", "").split(",")
+    if username.strip()
+)
+
+
+def admin_required(view):
+    """
+    Require a JWT token belonging to an admin user for accessing a route.
+
+    Args:
+    - view (function): The route function to protect.
+
+    Returns:
+    - function: The wrapped route function, which returns an error message with
+      a status code of 403 (Forbidden) if the JWT identity is not an admin.
+    """
+
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        # Check if the authenticated user is listed as an admin
+        if get_jwt_identity() not in ADMIN_USERNAMES:
+            return jsonify({"error": "Admin privileges required"}), 403
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,144 @@
+from flask import jsonify, request
+from api import api_bp
+from api.admin import admin_required
+from db import find_short_urls_with_prefix, taken_short_urls
+import os
+import re
+
+# Allowed custom aliases: letters, digits, '-' and '_', starting with a letter or digit
+ALIAS_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{2,63}$")
+
+# File listing aliases that cannot be claimed, one per line
+RESERVED_ALIASES_PATH = os.getenv(
+    "RESERVED_ALIASES_PATH",
+    os.path.join(os.path.dirname(__file__), "reserved_aliases.txt"),
+)
+
+# Maximum number of results returned by the alias search endpoint
+MAX_SEARCH_LIMIT = 100
+
+
+def load_reserved_aliases(path):
+    """
+    Load the reserved alias list into a set for constant-time membership checks.
+
+    Args:
+    - path (str): Path of the reserved alias file. Blank lines and lines
+      starting with '#' are ignored.
+
+    Returns:
+    - frozenset: The reserved aliases, lowercased.
+    """
+    with open(path, encoding="utf-8") as reserved_file:
+        return frozenset(
+            line.strip().lower()
+            for line in reserved_file
+            if line.strip() and not line.startswith("#")
+        )
+
+
+# Reserved aliases, loaded once when the module is imported
+RESERVED_ALIASES = load_reserved_aliases(RESERVED_ALIASES_PATH)
+
+
+def validate_alias(alias):
+    """
+    Check that a custom alias is well-formed and not reserved.
+
+    Args:
+    - alias (str): The requested custom alias.
+
+    Raises:
+    - ValueError: If the alias is malformed or reserved.
+    """
+    if not isinstance(alias, str) or not ALIAS_PATTERN.match(alias):
+        raise ValueError(
+            "Alias must be 3-64 characters of letters, digits, '-' or '_', "
+            "starting with a letter or digit"
+        )
+
+    if alias.lower() in RESERVED_ALIASES:
+        raise ValueError("Alias is reserved")
+
+
+def suggest_aliases(prefix, limit):
+    """
+    Suggest available aliases derived from a prefix.
+
+    Candidates are the prefix itself followed by numbered variants
+    ("prefix-2", "prefix-3", ...). Their availability is checked with a single
+    exact-match query on the short_url index, so the cost does not depend on
+    how many codes share the prefix.
+
+    Args:
+    - prefix (str): The prefix the suggestions start with.
+    - limit (int): The maximum number of suggestions.
+
+    Returns:
+    - list: Available aliases, in candidate order.
+    """
+    candidates = [prefix] + [f"{prefix}-{n}" for n in range(2, 2 * limit + 2)]
+    candidates = [
+        candidate
+        for candidate in candidates
+        if ALIAS_PATTERN.match(candidate)
+        and candidate.lower() not in RESERVED_ALIASES
+    ]
+
+    taken = taken_short_urls(candidates)
+    return [candidate for candidate in candidates if candidate not in taken][:limit]
+
+
+# Define route for searching short URLs and available aliases by prefix
+@api_bp.route("/aliases", methods=["GET"])
+# Require an admin JWT token for accessing this route
+@admin_required
+def search_aliases():
+    """
+    Search existing short URLs by prefix and suggest available aliases.
+
+    The prefix search is an anchored range scan over the unique short_url
+    index, so it stays fast regardless of the collection size.
+
+    Query Parameters:
+    - prefix (str): The prefix to search for (required).
+    - limit (int): The maximum number of results per list (default 10, max 100).
+
+    Returns:
+    - If the search is successful, returns a JSON response containing the taken
+      short URLs starting with the prefix and suggested available aliases, with a
+      status code of 200 (OK).
+    - If the prefix is missing or the limit is invalid, returns an error message
+      with a status code of 400 (Bad Request).
+    - If an unexpected error occurs during the search, returns an error message
+      with a status code of 500 (Internal Server Error).
+
+    Raises:
+    - ValueError: If the prefix is missing or the limit is invalid.
+    - Exception: If an unexpected error occurs during the search.
+    """
+    try:
+        # Extract the prefix and limit from the query string
+        prefix = request.args.get("prefix", "")
+        limit = int(request.args.get("limit", 10))
+
+        # Check if prefix is provided
+        if not prefix:
+            raise ValueError("Prefix not provided")
+
+        # Check if limit is within bounds
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise ValueError(f"Limit must be between 1 and {MAX_SEARCH_LIMIT}")
+
+        taken = find_short_urls_with_prefix(prefix, limit)
+        suggestions = suggest_aliases(prefix, limit)
+
+        return jsonify({"taken": taken, "suggestions": suggestions}), 200
+
+    except ValueError as ve:
+        # Return an error message if the query is invalid with status code 400
+        return jsonify({"error": str(ve)}), 400
+
+    except Exception as e:
+        # Return error message with status code 500 if an unexpected error occurs
+        return jsonify({"error": "An unexpected error occurred"}), 500
@@ -0,0 +1,162 @@
+from flask import jsonify, request
+from flask_jwt_extended import jwt_required
+from api import api_bp
+from api.decode import decode_one
+from api.encode import encode_one
+from db import DatabaseUnavailable
+
+# Maximum number of items in a single bulk request
+MAX_BULK_ITEMS = 100
+
+
+def run_item(handler, *args):
+    """
+    Run the encode or decode logic for one item of a bulk request.
+
+    Errors are turned into the same error messages and status codes as the
+    single-item routes, so one bad item does not fail the whole batch.
+
+    Args:
+    - handler (function): `encode_one` or `decode_one`.
+    - args: Arguments passed to the handler.
+
+    Returns:
+    - dict: The response body of the item, with its status code under "status".
+    """
+    try:
+        body, status = handler(*args)
+    except ValueError as ve:
+        body, status = {"error": str(ve)}, 400
+    except DatabaseUnavailable:
+        body, status = {"error": "Service temporarily unavailable"}, 503
+    except Exception:
+        body, status = {"error": "An unexpected error occurred"}, 500
+
+    return {**body, "status": status}
+
+
+def get_items(key):
+    """
+    Extract the list of items of a bulk request from its JSON body.
+
+    Args:
+    - key (str): The name of the list in the JSON body.
+
+    Returns:
+    - list: The items.
+
+    Raises:
+    - ValueError: If the list is missing, empty, or too long.
+    """
+    data = request.get_json()
+    items = data.get(key) if isinstance(data, dict) else None
+
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"{key} not provided")
+
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValueError(f"At most {MAX_BULK_ITEMS} {key} per request")
+
+    return items
+
+
+# Define route for encoding several long urls at once
+@api_bp.route("/encode/bulk", methods=["POST"])
+# Require JWT token for accessing this route
+@jwt_required()
+def encode_bulk():
+    """
+    Encode several long URLs in one request.
+
+    Each item is encoded exactly as by `/api/encode`, and gets its own result
+    and status code, in the order of the request.
+
+    JSON Request Body:
+    {
+        "items": [
+            {"long_url": "example_long_url", "alias": "optional_custom_alias"}
+        ]
+    }
+
+    Returns:
+    - If the request is valid, returns a JSON response containing one result per
+      item with a status code of 200 (OK). Each result holds either a short URL
+      or an error message, and the status code the item would get from
+      `/api/encode`.
+    - If the items are missing or there are too many, returns an error message
+      with a status code of 400 (Bad Request).
+    - If an unexpected error occurs, returns an error message with a status code
+      of 500 (Internal Server Error).
+
+    Raises:
+    - ValueError: If the items are missing or there are too many.
+    - Exception: If an unexpected error occurs while reading the request.
+    """
+    try:
+        items = get_items("items")
+
+        results = [
+            run_item(encode_one, item.get("long_url"), item.get("alias"))
+            if isinstance(item, dict)
+            else {"error": "Invalid item", "status": 400}
+            for item in items
+        ]
+        return jsonify({"results": results}), 200
+
+    except ValueError as ve:
+        # Return an error message if the items are invalid with status code 400
+        return jsonify({"error": str(ve)}), 400
+
+    except Exception as e:
+        # Return error message with status code 500 if an unexpected error occurs
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+
+# Define route for decoding several short urls at once
+@api_bp.route("/decode/bulk", methods=["POST"])
+# Require JWT token for accessing this route
+@jwt_required()
+def decode_bulk():
+    """
+    Decode several short URLs in one request.
+
+    Each short URL is decoded exactly as by `/api/decode`, and gets its own
+    result and status code, in the order of the request.
+
+    JSON Request Body:
+    {
+        "short_urls": ["example_short_url"]
+    }
+
+    Returns:
+    - If the request is valid, returns a JSON response containing one result per
+      short URL with a status code of 200 (OK). Each result holds either a long
+      URL or an error message, and the status code the short URL would get from
+      `/api/decode`.
+    - If the short URLs are missing or there are too many, returns an error
+      message with a status code of 400 (Bad Request).
+    - If an unexpected error occurs, returns an error message with a status code
+      of 500 (Internal Server Error).
+
+    Raises:
+    - ValueError: If the short URLs are missing or there are too many.
+    - Exception: If an unexpected error occurs while reading the request.
+    """
+    try:
+        short_urls = get_items("short_urls")
+
+        results = [
+            run_item(decode_one, short_url)
+            if isinstance(short_url, str)
+            else {"error": "Invalid short URL", "status": 400}
+            for short_url in short_urls
+        ]
+        return jsonify({"results": results}), 200
+
+    except ValueError as ve:
+        # Return an error message if the short URLs are invalid with status code 400
+        return jsonify({"error": str(ve)}), 400
+
+    except Exception as e:
+        # Return error message with status code 500 if an unexpected error occurs
+        return jsonify({"error": "An unexpected error occurred"}), 500
@@ -1,7 +1,50 @@
 from flask import jsonify, request
 from flask_jwt_extended import jwt_required
 from api import api_bp
-from db import url_collection
+from db import DatabaseUnavailable, lookup_short_url, record_click
+
+
+def decode_one(short_url):
+    """
+    Decode a single short URL and count the click.
+
+    This holds the decoding logic shared by the decode and bulk decode routes.
+
+    Args:
+    - short_url (str): The short URL, or just its identifier.
+
+    Returns:
+    - tuple: The response body and status code, as described in `decode_url`.
+
+    Raises:
+    - ValueError: If the short URL is not provided.
+    - DatabaseUnavailable: If the database is unavailable and the short URL is
+      not in the local snapshot.
+    """
+    # Extract the short URL's identifier from the last part of the URL
+    short_url = short_url.split("/")[-1] if short_url else None
+
+    # Check if short URL is provided
+    if not short_url:
+        raise ValueError("Short URL not provided")
+
+    # Find the URL mapping in the database using the short URL
+    url_mapping = lookup_short_url(short_url)
+
+    # Check if URL mapping is found
+    if not url_mapping:
+        # Return error message with status code 404 if short URL is not found
+        return {"error": "Short URL not found"}, 404
+
+    try:
+        # Count the click in the analytics rollups
+        record_click(short_url)
+    except Exception:
+        # Analytics must never prevent a redirect
+        pass
+
+    # Return the long URL associated with the short URL with status code 200
+    return {"long_url": url_mapping["long_url"]}, 200
 
 
 # Define route for decoding short url
@@ -29,6 +72,8 @@ def decode_url():
       status code of 404 (Not Found).
     - If the short URL is not provided in the request body, returns an error message
       indicating that the short URL was not provided with a status code of 400 (Bad Request).
+    - If the database is unavailable and the short URL is not in the local snapshot,
+      returns an error message with a status code of 503 (Service Unavailable).
     - If an unexpected error occurs during the encoding process, returns an error message
       with a status code of 500 (Internal Server Error).
 
@@ -40,30 +85,19 @@ def decode_url():
     try:
         # Get JSON data from the request
         data = request.get_json()
-        # Extract short URL from JSON data
-        short_url = data.get("short_url")
-        # Extract the short URL's identifier from the last part of the URL
-        short_url = short_url.split("/")[-1]
-
-        # Check if short URL is provided
-        if not short_url:
-            raise ValueError("Short URL not provided")
-
-        # Find the URL mapping in the database using the short URL
-        url_mapping = url_collection.find_one({"short_url": short_url})
 
-        # Check if URL mapping is found
-        if not url_mapping:
-            # Return error message with status code 404 if short URL is not found
-            return jsonify({"error": "Short URL not found"}), 404
-
-        # Return the long URL associated with the short URL with status code 200
-        return jsonify({"long_url": url_mapping["long_url"]}), 200
+        # Decode the short URL
+        body, status = decode_one(data.get("short_url"))
+        return jsonify(body), status
 
     except ValueError as ve:
         # Return an error message if short URL is not provided with status code 400
         return jsonify({"error": str(ve)}), 400
 
+    except DatabaseUnavailable:
+        # Return error message with status code 503 if the database is unavailable
+        return jsonify({"error": "Service temporarily unavailable"}), 503
+
     except Exception as e:
         # Return error message with status code 500 if an unexpected error occurs
         return jsonify({"error": "An unexpected error occurred"}), 500
@@ -1,20 +1,35 @@
 from flask import jsonify, request
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from api import api_bp
-from db import url_collection
+from api.aliases import validate_alias
+from api.validation import STATUS_PENDING, normalize_url, validation_pipeline
+from db import (
+    DatabaseUnavailable,
+    find_mapping,
+    find_owned_mapping,
+    keyspace,
+    store_mapping,
+)
 import hashlib
 import random
 import string
-import base64
+
+
+# Maximum number of generated short URLs tried before giving up on a collision streak
+MAX_GENERATION_ATTEMPTS = 10
 
 
 # Define a function to generate a short URL based on the given long URL
-def generate_short_url(long_url):
+def generate_short_url(long_url, length, alphabet):
     """
     Generate a short URL based on the given long URL.
 
     Args:
     - long_url (str): The long URL to be encoded.
+    - length (int): The number of characters of the short URL.
+    - alphabet (str): The characters the short URL is made of.
 
     Returns:
     - str: The encoded short URL.
@@ -25,11 +40,184 @@ def generate_short_url(long_url):
     hash_str = hash_obj.hexdigest()[:16]
     # Generate a random alphanumeric string of length 4
     random_str = "".join(random.choices(string.ascii_letters + string.digits, k=4))
-    # Combine the hash and random string
+    # Combine the hash and random string and hash them into a large number
     combined_str = hash_str + random_str
-    # Encode the combined string using base64 and take the first 8 characters
-    encoded_str = base64.b64encode(combined_str.encode()).decode()[:8]
-    return encoded_str
+    number = int.from_bytes(hashlib.sha256(combined_str.encode()).digest(), "big")
+    # Write the number in base len(alphabet) and keep the first `length` digits
+    encoded_chars = []
+    for _ in range(length):
+        number, index = divmod(number, len(alphabet))
+        encoded_chars.append(alphabet[index])
+    return "".join(encoded_chars)
+
+
+def store_generated_mapping(long_url):
+    """
+    Generate a free short URL for a long URL and store the mapping.
+
+    A generated short URL that is already taken is a collision; a new one is
+    generated until a free one is found. The number of collisions is recorded
+    for the keyspace metrics.
+
+    Args:
+    - long_url (str): The long URL to be encoded.
+
+    Returns:
+    - str: The stored short URL.
+
+    Raises:
+    - RuntimeError: If no free short URL was found within the maximum number
+      of attempts.
+    """
+    for attempt in range(MAX_GENERATION_ATTEMPTS):
+        short_url = generate_short_url(long_url, keyspace.length, keyspace.alphabet)
+
+        # Check if the short URL is pending in the write-behind queue or already stored
+        if find_mapping("short_url", short_url):
+            continue
+
+        try:
+            store_mapping(new_mapping(short_url, long_url))
+        except DuplicateKeyError:
+            # Another request stored the same short URL in the meantime
+            continue
+
+        keyspace.record_encode(collision_retries=attempt, length=len(short_url))
+        return short_url
+
+    keyspace.record_encode(collision_retries=MAX_GENERATION_ATTEMPTS)
+    raise RuntimeError("Could not generate a free short URL")
+
+
+def new_mapping(short_url, long_url):
+    """
+    Build the document for a new URL mapping owned by the current user.
+
+    The `_id` is assigned here rather than by the database, so mappings buffered
+    by the write-behind queue already carry the creation-ordered id used to
+    paginate a user's links.
+
+    Args:
+    - short_url (str): The short URL identifier.
+    - long_url (str): The long URL the short URL points to.
+
+    Returns:
+    - dict: The URL mapping document.
+    """
+    return {
+        "_id": ObjectId(),
+        "short_url": short_url,
+        "long_url": long_url,
+        "owner": get_jwt_identity(),
+        "status": STATUS_PENDING,
+    }
+
+
+def queue_validation(short_url, long_url):
+    """
+    Queue the long URL of a new mapping for background reachability probing.
+    """
+    if validation_pipeline:
+        validation_pipeline.submit(short_url, long_url)
+
+
+def encode_alias(long_url, alias):
+    """
+    Map a custom alias to a long URL.
+
+    The mapping is inserted directly rather than through the write-behind queue,
+    so the unique short_url index decides atomically whether the alias is free.
+
+    Args:
+    - long_url (str): The long URL the alias should point to.
+    - alias (str): The requested custom alias.
+
+    Returns:
+    - tuple: The response body and status code, as described in `encode_url`.
+
+    Raises:
+    - ValueError: If the alias is malformed or reserved.
+    """
+    validate_alias(alias)
+
+    # Check if the alias is pending in the write-behind queue or already stored
+    existing_mapping = find_mapping("short_url", alias)
+
+    if not existing_mapping:
+        try:
+            # Insert the mapping, relying on the unique index to detect a taken alias
+            store_mapping(new_mapping(alias, long_url), write_behind=False)
+            queue_validation(alias, long_url)
+            return {"short_url": f"https://short.est/{alias}"}, 201
+        except DuplicateKeyError:
+            # Another request claimed the alias in the meantime
+            existing_mapping = find_mapping("short_url", alias)
+
+    if (
+        existing_mapping
+        and existing_mapping["long_url"] == long_url
+        and existing_mapping.get("owner") == get_jwt_identity()
+    ):
+        # The user already mapped this alias to this long URL
+        return {"short_url": f"https://short.est/{alias}"}, 200
+
+    return {"error": "Alias already taken"}, 409
+
+
+def encode_one(long_url, alias=None):
+    """
+    Encode a single long URL, optionally with a custom alias.
+
+    This holds the encoding logic shared by the encode and bulk encode routes.
+
+    Args:
+    - long_url (str): The long URL to be encoded.
+    - alias (str): The requested custom alias, or None to generate a short URL.
+
+    Returns:
+    - tuple: The response body and status code, as described in `encode_url`.
+
+    Raises:
+    - ValueError: If the long URL is not provided or is not a valid URL, or if
+      the custom alias is malformed or reserved.
+    - DatabaseUnavailable: If the database is unavailable.
+    """
+    # Check if long URL is provided
+    if not long_url:
+        raise ValueError("Long URL not provided")
+
+    # Check if the URL starts with either "http://" or "https://"
+    if not long_url.lower().startswith(("http://", "https://")):
+        return {"error": "Only URLs starting with http:// or https:// are allowed"}, 400
+
+    # Parse and normalize the long URL so equivalent URLs share a short URL
+    long_url = normalize_url(long_url)
+
+    if alias is not None:
+        return encode_alias(long_url, alias)
+
+    # Check if the user already shortened the long URL, or if its short form exists
+    existing_long_url_mapping = find_owned_mapping(long_url, get_jwt_identity())
+    existing_short_url_mapping = find_mapping("short_url", long_url.split("/")[-1])
+
+    if existing_long_url_mapping:
+        # If the user already shortened the long_url, return their short_url
+        short_url = existing_long_url_mapping["short_url"]
+
+    elif existing_short_url_mapping:
+        # If the short URL already exists, return it
+        short_url = existing_short_url_mapping["short_url"]
+
+    else:
+        # Generate a new short URL for the long URL and store the mapping
+        short_url = store_generated_mapping(long_url)
+        # Probe the long URL in the background
+        queue_validation(short_url, long_url)
+        # Return the short URL in the response
+        return {"short_url": f"https://short.est/{short_url}"}, 201
+
+    # Return the existing short URL in the response
+    return {"short_url": f"https://short.est/{short_url}"}, 200
 
 
 # Define route for encoding long url
@@ -42,78 +230,62 @@ def encode_url():
 
     This function receives a long URL from the request body, generates a short URL
     based on it, and stores the mapping between the long URL and short URL in the database.
+    If a custom alias is provided, it is used as the short URL instead of a generated one.
+    The long URL is normalized before it is stored, and its reachability is probed
+    in the background afterwards, so the mapping starts with a "pending" status.
 
     JSON Request Body:
     {
-        "long_url": "example_long_url"
+        "long_url": "example_long_url",
+        "alias": "optional_custom_alias"
     }
 
     Returns:
     - If encoding is successful and the short URL is generated, returns a JSON response
       containing the short URL with a status code of 201 (Created).
-    - If the long URL already exists in the database, returns the existing short URL
-      associated with it with a status code of 200 (OK).
+    - If the current user already shortened the long URL, returns their existing
+      short URL with a status code of 200 (OK). Other users' mappings of the same
+      long URL are not reused, so each user owns the links they create.
     - If the short URL already exists in the database, returns the existing short URL
       with a status code of 200 (OK).
-    - If the long URL provided is invalid (does not start with 'http://' or 'https://'),
-      returns an error message with a status code of 400 (Bad Request).
+    - If a custom alias is provided and is available, returns a JSON response containing
+      the short URL made of the alias with a status code of 201 (Created). If the user
+      already mapped the alias to the same long URL, it is returned with a status code
+      of 200 (OK).
+    - If the custom alias is malformed or reserved, returns an error message with a
+      status code of 400 (Bad Request).
+    - If the custom alias is already taken by another long URL or another user, returns
+      an error message with a status code of 409 (Conflict).
+    - If the long URL provided is invalid (does not start with 'http://' or 'https://',
+      or cannot be parsed), returns an error message with a status code of 400 (Bad Request).
     - If the long URL is not provided in the request body, returns an error message
       indicating that the long URL was not provided with a status code of 400 (Bad Request).
+    - If the database is unavailable, returns an error message with a status code
+      of 503 (Service Unavailable).
     - If an unexpected error occurs during the encoding process, returns an error message
       with a status code of 500 (Internal Server Error).
 
     Raises:
-    - ValueError: If the long URL is not provided in the request body.
+    - ValueError: If the long URL is not provided in the request body or is not a
+      valid URL, or if the custom alias is malformed or reserved.
     - Exception: If an unexpected error occurs during the encoding process.
     """
     try:
         # Get JSON data from the request
         data = request.get_json()
-        # Extract the long URL from the JSON data
-        long_url = data.get("long_url")
-
-        # Check if long URL is provided
-        if not long_url:
-            raise ValueError("Long URL not provided")
-
-        # Check if the URL starts with either "http://" or "https://"
-        if not long_url.startswith(("http://", "https://")):
-            return (
-                jsonify(
-                    {"error": "Only URLs starting with http:// or https:// are allowed"}
-                ),
-                400,
-            )
-
-        # Check if the long URL or its short form already exists in the database
-        existing_long_url_mapping = url_collection.find_one({"long_url": long_url})
-        existing_short_url_mapping = url_collection.find_one(
-            {"short_url": long_url.split("/")[-1]}
-        )
-
-        if existing_long_url_mapping:
-            # If the long_url already exists, return the associated short_url
-            short_url = existing_long_url_mapping["short_url"]
-
-        elif existing_short_url_mapping:
-            # If the short URL already exists, return it
-            short_url = existing_short_url_mapping["short_url"]
-
-        else:
-            # Generate a new short URL for the long URL
-            short_url = generate_short_url(long_url)
-            # Insert the mapping of short URL to long URL into the database
-            url_collection.insert_one({"short_url": short_url, "long_url": long_url})
-            # Return the short URL in the response
-            return jsonify({"short_url": f"https://short.est/{short_url}"}), 201
-
-        # Return the existing short URL in the response
-        return jsonify({"short_url": f"https://short.est/{short_url}"}), 200
+
+        # Encode the long URL, with the custom alias if one is provided
+        body, status = encode_one(data.get("long_url"), data.get("alias"))
+        return jsonify(body), status
 
     except ValueError as ve:
         # Return an error message if long URL is not provided with status code 400
         return jsonify({"error": str(ve)}), 400
 
+    except DatabaseUnavailable:
+        # Return error message with status code 503 if the database is unavailable
+        return jsonify({"error": "Service temporarily unavailable"}), 503
+
     except Exception as e:
         # Return error message with status code 500 if an unexpected error occurs
         return jsonify({"error": "An unexpected error occurred"}), 500
@@ -0,0 +1,85 @@
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from bson import ObjectId
+from api import api_bp
+from db import find_links_by_owner
+
+# Number of links returned per page when no limit is given
+DEFAULT_PAGE_SIZE = 20
+
+# Maximum number of links returned per page
+MAX_PAGE_SIZE = 100
+
+
+# Define route for listing the current user's links
+@api_bp.route("/links", methods=["GET"])
+# Require JWT token for accessing this route
+@jwt_required()
+def list_links():
+    """
+    List the short URLs created by the current user, newest first.
+
+    Results are paginated with an opaque cursor: each page includes a
+    `next_cursor` value that is passed back to fetch the following page, and
+    which is null on the last page.
+
+    Query Parameters:
+    - cursor (str): The cursor returned with the previous page (optional).
+    - limit (int): The maximum number of links per page (default 20, max 100).
+
+    Returns:
+    - If listing is successful, returns a JSON response containing the links and
+      the cursor of the next page with a status code of 200 (OK).
+    - If the cursor or limit is invalid, returns an error message with a status
+      code of 400 (Bad Request).
+    - If an unexpected error occurs during the listing, returns an error message
+      with a status code of 500 (Internal Server Error).
+
+    Raises:
+    - ValueError: If the cursor or limit is invalid.
+    - Exception: If an unexpected error occurs during the listing.
+    """
+    try:
+        # Extract the cursor and page size from the query string
+        cursor = request.args.get("cursor")
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+
+        # Check if limit is within bounds
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        # Check if the cursor is a valid link id
+        if cursor is not None and not ObjectId.is_valid(cursor):
+            raise ValueError("Invalid cursor")
+
+        before_id = ObjectId(cursor) if cursor else None
+
+        # Fetch one extra link to know whether another page follows
+        links = find_links_by_owner(get_jwt_identity(), before_id, limit + 1)
+        next_cursor = str(links[limit - 1]["_id"]) if len(links) > limit else None
+
+        return (
+            jsonify(
+                {
+                    "links": [
+                        {
+                            "short_url": f"https://short.est/{link['short_url']}",
+                            "long_url": link["long_url"],
+                            "status": link.get("status"),
+                            "created_at": link["_id"].generation_time.isoformat(),
+                        }
+                        for link in links[:limit]
+                    ],
+                    "next_cursor": next_cursor,
+                }
+            ),
+            200,
+        )
+
+    except ValueError as ve:
+        # Return an error message if the query is invalid with status code 400
+        return jsonify({"error": str(ve)}), 400
+
+    except Exception as e:
+        # Return error message with status code 500 if an unexpected error occurs
+        return jsonify({"error": "An unexpected error occurred"}), 500
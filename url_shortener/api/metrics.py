@@ -0,0 +1,37 @@
+from flask import jsonify
+from api import api_bp
+from api.admin import admin_required
+from db import keyspace
+
+
+# Define route for reporting short code keyspace metrics
+@api_bp.route("/metrics/keyspace", methods=["GET"])
+# Require an admin JWT token for accessing this route
+@admin_required
+def keyspace_metrics():
+    """
+    Report how much of the short code keyspace is used.
+
+    The report covers the current short code length and alphabet size, the
+    keyspace capacity and utilization, the collision probability of a newly
+    generated code, the average number of collision retries per encode, the
+    creation rate over the last hour, and when the code length is projected to
+    grow and the current keyspace to be exhausted at that rate. Utilization
+    counts the codes generated at the current length, as published by each
+    process's last keyspace refresh. Reading the metrics changes nothing.
+
+    Returns:
+    - If the metrics are computed, returns a JSON response containing them with a
+      status code of 200 (OK).
+    - If an unexpected error occurs, returns an error message with a status code
+      of 500 (Internal Server Error).
+
+    Raises:
+    - Exception: If an unexpected error occurs while computing the metrics.
+    """
+    try:
+        return jsonify(keyspace.metrics()), 200
+
+    except Exception as e:
+        # Return error message with status code 500 if an unexpected error occurs
+        return jsonify({"error": "An unexpected error occurred"}), 500
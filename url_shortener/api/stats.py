@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from api import api_bp
+from api.admin import ADMIN_USERNAMES
+from db import DatabaseUnavailable, GRANULARITIES, find_mapping, get_click_counts
+
+# Time range reported when no start is given
+DEFAULT_RANGE = timedelta(days=30)
+
+# Maximum number of buckets a single stats query may cover
+MAX_BUCKETS = 2000
+
+
+def parse_timestamp(value, name):
+    """
+    Parse an ISO 8601 timestamp from the query string, assuming UTC if no offset is given.
+
+    Args:
+    - value (str): The timestamp to parse.
+    - name (str): The name of the query parameter, used in error messages.
+
+    Returns:
+    - datetime: The parsed timezone-aware timestamp.
+
+    Raises:
+    - ValueError: If the timestamp is not valid ISO 8601.
+    """
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} timestamp, expected ISO 8601")
+
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+# Define route for reporting the clicks of a short url
+@api_bp.route("/links/<short_url>/stats", methods=["GET"])
+# Require JWT token for accessing this route
+@jwt_required()
+def link_stats(short_url):
+    """
+    Report the clicks of a short URL over a time range.
+
+    The counts are read from pre-aggregated minute, hour or day buckets, so the
+    cost of a query depends on the number of buckets in the range, not on the
+    number of clicks. Only the owner of the short URL (or an admin) can view
+    its stats.
+
+    Query Parameters:
+    - granularity (str): "minute", "hour" or "day" (default "hour").
+    - start (str): ISO 8601 start of the range (default 30 days before end).
+    - end (str): ISO 8601 end of the range (default now).
+
+    Returns:
+    - If the query is successful, returns a JSON response containing the total
+      click count and the count of every bucket in the range, with a status code
+      of 200 (OK).
+    - If the granularity or range is invalid, or covers more than the maximum
+      number of buckets, returns an error message with a status code of 400
+      (Bad Request).
+    - If the short URL does not exist or belongs to another user, returns an error
+      message with a status code of 404 (Not Found).
+    - If the database is unavailable, returns an error message with a status code
+      of 503 (Service Unavailable).
+    - If an unexpected error occurs, returns an error message with a status code
+      of 500 (Internal Server Error).
+
+    Raises:
+    - ValueError: If the granularity or range is invalid.
+    - Exception: If an unexpected error occurs while reading the stats.
+    """
+    try:
+        # Extract the granularity and time range from the query string
+        granularity = request.args.get("granularity", "hour")
+        end = request.args.get("end")
+        end = parse_timestamp(end, "end") if end else datetime.now(timezone.utc)
+        start = request.args.get("start")
+        start = parse_timestamp(start, "start") if start else end - DEFAULT_RANGE
+
+        # Check if granularity is supported
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularity must be one of: {', '.join(GRANULARITIES)}")
+
+        # Check if the range is valid and small enough
+        if start >= end:
+            raise ValueError("Start must be before end")
+        if (end - start) / GRANULARITIES[granularity][0] > MAX_BUCKETS:
+            raise ValueError(
+                f"Range covers more than {MAX_BUCKETS} buckets, use a coarser granularity"
+            )
+
+        # Check if the short URL exists and belongs to the current user
+        url_mapping = find_mapping("short_url", short_url)
+        identity = get_jwt_identity()
+        if not url_mapping or (
+            url_mapping.get("owner") != identity and identity not in ADMIN_USERNAMES
+        ):
+            return jsonify({"error": "Short URL not found"}), 404
+
+        buckets = get_click_counts(short_url, granularity, start, end)
+
+        return (
+            jsonify(
+                {
+                    "short_url": f"https://short.est/{short_url}",
+                    "granularity": granularity,
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "total": sum(count for _, count in buckets),
+                    "buckets": [
+                        {"start": bucket.isoformat(), "count": count}
+                        for bucket, count in buckets
+                    ],
+                }
+            ),
+            200,
+        )
+
+    except ValueError as ve:
+        # Return an error message if the query is invalid with status code 400
+        return jsonify({"error": str(ve)}), 400
+
+    except DatabaseUnavailable:
+        # Return error message with status code 503 if the database is unavailable
+        return jsonify({"error": "Service temporarily unavailable"}), 503
+
+    except Exception as e:
+        # Return error message with status code 500 if an unexpected error occurs
+        return jsonify({"error": "An unexpected error occurred"}), 500
@@ -0,0 +1,382 @@
+from collections import deque
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit
+import asyncio
+import ipaddress
+import os
+import ssl
+import threading
+from db import set_mapping_status
+
+# Validation statuses of a URL mapping
+STATUS_PENDING = "pending"
+STATUS_OK = "ok"
+STATUS_BROKEN = "broken"
+STATUS_UNREACHABLE = "unreachable"
+STATUS_BLOCKED = "blocked"
+
+# Ports implied by each scheme, dropped from normalized URLs
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Probe long URLs in the background after encoding
+URL_VALIDATION_ENABLED = os.getenv("URL_VALIDATION_ENABLED", "true").lower() == "true"
+
+# Maximum number of probes running at once, and per target host
+URL_VALIDATION_CONCURRENCY = int(os.getenv("URL_VALIDATION_CONCURRENCY", "50"))
+URL_VALIDATION_PER_HOST = int(os.getenv("URL_VALIDATION_PER_HOST", "2"))
+
+# Seconds a single probe may take, from DNS resolution to the status line
+URL_VALIDATION_TIMEOUT = float(os.getenv("URL_VALIDATION_TIMEOUT_SECONDS", "5"))
+
+# Maximum number of URLs waiting to be probed; further URLs stay pending
+URL_VALIDATION_QUEUE_SIZE = int(os.getenv("URL_VALIDATION_QUEUE_SIZE", "10000"))
+
+# Allow probing loopback and private network addresses (for local testing only)
+URL_VALIDATION_ALLOW_PRIVATE = (
+    os.getenv("URL_VALIDATION_ALLOW_PRIVATE", "false").lower() == "true"
+)
+
+
+def normalize_url(long_url):
+    """
+    Parse and normalize a long URL.
+
+    The scheme and host are lowercased, internationalized host names are
+    converted to their ASCII form, and the port is dropped when it is the
+    scheme's default, so equivalent URLs map to the same short URL.
+
+    Args:
+    - long_url (str): The long URL to normalize.
+
+    Returns:
+    - str: The normalized URL.
+
+    Raises:
+    - ValueError: If the URL is not a valid http:// or https:// URL.
+    """
+    long_url = long_url.strip()
+
+    # Check if the URL contains whitespace, which is never valid inside a URL
+    if any(character.isspace() for character in long_url):
+        raise ValueError("Invalid URL")
+
+    try:
+        parts = urlsplit(long_url)
+        port = parts.port
+        host = parts.hostname.encode("idna").decode("ascii") if parts.hostname else ""
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid URL")
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not host:
+        raise ValueError("Invalid URL")
+
+    # Keep IPv6 literals bracketed
+    netloc = f"[{host}]" if ":" in host else host
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    return urlunsplit((scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+def status_for_code(http_status):
+    """
+    Map the HTTP status code returned by a target to a validation status.
+    """
+    if http_status < 400:
+        return STATUS_OK
+    return STATUS_BROKEN
+
+
+class ValidationPipeline:
+    """
+    Probe the targets of new URL mappings in the background.
+
+    URLs are queued from request handlers and probed by asyncio tasks running
+    in a dedicated thread. The number of probes in flight is bounded both
+    globally and per target host, so a burst of links to one site does not
+    hammer it. URLs wait in one queue per host, and a probe is only started for
+    a host with a free slot, taking hosts in turn; a burst of links to one host
+    therefore never holds up the probes of other hosts. Each probe sends a HEAD
+    request (falling back to GET for servers that reject HEAD), and the outcome
+    is reported to `on_result`.
+    URLs submitted while the pipeline is not running (before `start`, or in
+    scripts that never start it) are buffered, up to `queue_size`, and queued
+    once it starts.
+
+    Args:
+    - on_result (function): Called from a worker thread with the short URL and
+      a dict of fields describing the outcome (`status`, `http_status`,
+      `checked_at`).
+    - concurrency (int): Maximum number of probes in flight.
+    - per_host (int): Maximum number of probes in flight per target host.
+    - timeout (float): Seconds a single probe may take.
+    - queue_size (int): Maximum number of URLs waiting to be probed.
+    - allow_private (bool): Whether targets resolving to loopback or private
+      addresses may be probed.
+    """
+
+    def __init__(
+        self,
+        on_result,
+        concurrency=50,
+        per_host=2,
+        timeout=5.0,
+        queue_size=10000,
+        allow_private=False,
+    ):
+        self.on_result = on_result
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self.allow_private = allow_private
+        self._loop = None
+        self._thread = None
+        self._started = threading.Event()
+        # URLs submitted while the pipeline is not running, and whether it is
+        self._backlog = deque(maxlen=queue_size)
+        self._running = False
+        self._submit_lock = threading.Lock()
+        # Scheduling state, only used from the event loop thread: the URLs waiting
+        # per host, the hosts with waiting URLs and a free slot (in turn), and
+        # the probes in flight per host, as tasks referenced until they finish
+        self._waiting = {}
+        self._ready = deque()
+        self._queued = 0
+        self._in_flight = {}
+        self._tasks = set()
+        self._ssl_context = ssl.create_default_context()
+
+    def start(self):
+        """
+        Start the event loop thread running the probes.
+        """
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run, name="url-validation", daemon=True
+        )
+        self._thread.start()
+        self._started.wait()
+
+        # Queue the URLs submitted before the pipeline was running
+        with self._submit_lock:
+            self._running = True
+            while self._backlog:
+                self._loop.call_soon_threadsafe(self._enqueue, *self._backlog.popleft())
+
+    def stop(self):
+        """
+        Stop probing, abandoning the URLs still queued.
+        """
+        if self._thread is None:
+            return
+
+        with self._submit_lock:
+            self._running = False
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._started.clear()
+
+    def submit(self, short_url, long_url):
+        """
+        Queue a URL mapping for probing. Safe to call from any thread.
+
+        Args:
+        - short_url (str): The short URL identifier of the mapping.
+        - long_url (str): The long URL to probe.
+        """
+        with self._submit_lock:
+            if not self._running:
+                # Probe it once the pipeline starts; the oldest URLs go first if full
+                self._backlog.append((short_url, long_url))
+                return
+            self._loop.call_soon_threadsafe(self._enqueue, short_url, long_url)
+
+    def _enqueue(self, short_url, long_url):
+        """
+        Add a URL to the queue of its host and start probes for free slots.
+        """
+        if self._queued >= self.queue_size:
+            # The mapping keeps its pending status until it is validated again
+            return
+
+        host = urlsplit(long_url).hostname
+        if host not in self._waiting:
+            self._waiting[host] = deque()
+            if self._in_flight.get(host, 0) < self.per_host:
+                self._ready.append(host)
+        self._waiting[host].append((short_url, long_url))
+        self._queued += 1
+
+        self._dispatch()
+
+    def _dispatch(self):
+        """
+        Start probes for waiting URLs while there are free global and host slots.
+        """
+        while self._ready and len(self._tasks) < self.concurrency:
+            host = self._ready.popleft()
+            waiting = self._waiting[host]
+            short_url, long_url = waiting.popleft()
+            self._queued -= 1
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+
+            if not waiting:
+                del self._waiting[host]
+            elif self._in_flight[host] < self.per_host:
+                # Other hosts get their turn before this one's next URL
+                self._ready.append(host)
+
+            task = self._loop.create_task(self._handle(short_url, long_url))
+            self._tasks.add(task)
+            task.add_done_callback(lambda task, host=host: self._finish(task, host))
+
+    def _finish(self, task, host):
+        """
+        Release the slots of a finished probe and start the next waiting ones.
+        """
+        self._tasks.discard(task)
+
+        # A host with waiting URLs and a full slot count is not ready; now it is
+        if self._in_flight[host] == self.per_host and host in self._waiting:
+            self._ready.append(host)
+
+        self._in_flight[host] -= 1
+        if not self._in_flight[host]:
+            # Forget hosts without probes in flight so the table stays small
+            del self._in_flight[host]
+
+        self._dispatch()
+
+    def _run(self):
+        """
+        Run the event loop until the pipeline is stopped.
+        """
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._started.set()
+
+        try:
+            self._loop.run_forever()
+        finally:
+            # Abandon the URLs still waiting first, so finishing probes start no others
+            self._waiting.clear()
+            self._ready.clear()
+            self._queued = 0
+
+            # Then abandon the probes in flight
+            tasks = list(self._tasks)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True)
+            )
+            self._loop.close()
+            self._in_flight.clear()
+
+    async def _handle(self, short_url, long_url):
+        """
+        Probe a queued URL and report the outcome.
+        """
+        try:
+            result = await self.probe(long_url)
+            result["checked_at"] = datetime.now(timezone.utc)
+            # Reporting may block on the database, so keep it off the event loop
+            await self._loop.run_in_executor(None, self.on_result, short_url, result)
+        except Exception:
+            # A failed report leaves the mapping pending
+            pass
+
+    async def probe(self, long_url):
+        """
+        Probe a URL and return its validation status.
+
+        Args:
+        - long_url (str): The normalized long URL to probe.
+
+        Returns:
+        - dict: The `status` of the URL and, when a response was received, its
+          `http_status`.
+        """
+        parts = urlsplit(long_url)
+
+        try:
+            return await asyncio.wait_for(self._probe(parts), self.timeout)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            return {"status": STATUS_UNREACHABLE, "http_status": None}
+
+    async def _probe(self, parts):
+        """
+        Resolve the target host and request it with HEAD, or GET if HEAD is rejected.
+        """
+        port = parts.port or DEFAULT_PORTS[parts.scheme]
+        addresses = await self._loop.getaddrinfo(parts.hostname, port)
+        address = addresses[0][4][0]
+
+        # Refuse to probe internal services through user-submitted URLs
+        if not self.allow_private and not ipaddress.ip_address(address).is_global:
+            return {"status": STATUS_BLOCKED, "http_status": None}
+
+        http_status = await self._request("HEAD", parts, address, port)
+        if http_status in (405, 501):
+            http_status = await self._request("GET", parts, address, port)
+
+        return {"status": status_for_code(http_status), "http_status": http_status}
+
+    async def _request(self, method, parts, address, port):
+        """
+        Send one HTTP/1.1 request to a resolved address and return the status code.
+        """
+        secure = parts.scheme == "https"
+        reader, writer = await asyncio.open_connection(
+            address,
+            port,
+            ssl=self._ssl_context if secure else None,
+            server_hostname=parts.hostname if secure else None,
+        )
+
+        try:
+            path = parts.path or "/"
+            if parts.query:
+                path = f"{path}?{parts.query}"
+            host = parts.netloc.rpartition("@")[2]
+
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                "User-Agent: url-shortener-validator\r\n"
+                "Accept: */*\r\n"
+                "Connection: close\r\n\r\n".encode("ascii")
+            )
+            await writer.drain()
+
+            # Only the status line is needed, e.g. "HTTP/1.1 200 OK"
+            status_line = await reader.readline()
+            return int(status_line.split()[1])
+        except IndexError:
+            raise ValueError("Malformed HTTP response")
+        finally:
+            writer.close()
+
+
+# Pipeline probing new long URLs, or None when validation is disabled
+validation_pipeline = None
+
+if URL_VALIDATION_ENABLED:
+    validation_pipeline = ValidationPipeline(
+        set_mapping_status,
+        concurrency=URL_VALIDATION_CONCURRENCY,
+        per_host=URL_VALIDATION_PER_HOST,
+        timeout=URL_VALIDATION_TIMEOUT,
+        queue_size=URL_VALIDATION_QUEUE_SIZE,
+        allow_private=URL_VALIDATION_ALLOW_PRIVATE,
+    )
@@ -1,25 +1,18 @@
 import os
-from flask import Flask, jsonify
-from flask_jwt_extended import JWTManager
+import threading
 from dotenv import load_dotenv
-from db import revoked_token_collection
-from auth import auth_bp
-from api import api_bp
 
-# Load environment variables from the .env file
+# Load environment variables from the .env file before the data layer reads its settings
 load_dotenv()
 
-app = Flask(__name__)
-
-# Set the secret key for JWT
-app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "SecretKey")
-
-
-# Initialize JWT extension with the Flask app
-jwt = JWTManager(app)
+import click
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager
+from pymongo.errors import PyMongoError
+import db
+from db import is_token_revoked
 
 
-@jwt.token_in_blocklist_loader
 def check_if_token_in_blacklist(_, jwt_data):
     """
     Check if a JWT access token is in the blacklist of revoked tokens.
@@ -45,18 +38,136 @@ def check_if_token_in_blacklist(_, jwt_data):
     jti = jwt_data["jti"]
 
     # Check if the token's jti is in the database of revoked tokens
-    if revoked_token_collection.find_one({"token": jti}):
+    if is_token_revoked(jti):
         return jsonify({"error": "Token has been revoked"}), 401
 
     # Token not revoked, continue processing
     return None
 
 
-# Register the API blueprint with URL prefix '/api'
-app.register_blueprint(api_bp, url_prefix="/api")
+@click.command("init-db")
+@click.option(
+    "--dedupe",
+    is_flag=True,
+    help="Move URL mappings sharing a short URL to the url_duplicates collection.",
+)
+def init_db_command(dedupe):
+    """
+    Create the MongoDB indexes used by the URL Shortener.
+
+    Short URLs generated by older versions may be shared by several mappings,
+    which prevents creating the unique short_url index. With `--dedupe`, only
+    the oldest mapping of each short URL is kept first.
+    """
+    if dedupe:
+        moved = db.dedupe_short_urls()
+        click.echo(f"Moved {moved} duplicate URL mappings to url_duplicates")
+
+    try:
+        db.ensure_indexes()
+    except db.DuplicateShortUrls:
+        # Count the duplicates here only, since it scans the whole collection
+        count = len(db.find_duplicate_short_urls())
+        raise click.ClickException(str(db.DuplicateShortUrls(count)))
+
+    click.echo("Database indexes created")
+
+
+def create_app(config=None):
+    """
+    Create and configure the URL Shortener Flask application.
+
+    Creating the app does not contact MongoDB unless `DB_INIT_ON_STARTUP` is
+    enabled: the database client is created on first use, and index setup is
+    a separate phase run once per deployment with `flask init-db`. When it is
+    enabled and MongoDB is unreachable, the error is logged and the app is
+    created anyway, so workers can still boot during a database incident.
+
+    The per-process background work (click flushing, keyspace refresh, the
+    write-behind queue, snapshot refresh and URL probes) starts when the app
+    serves its first request, so CLI commands and benchmarks that only create
+    the app never start it.
+
+    Args:
+    - config (dict): Optional configuration values overriding the defaults
+      read from the environment.
+
+    Returns:
+    - Flask: The configured Flask application.
+    """
+    app = Flask(__name__)
+
+    # Set the secret key for JWT
+    app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "SecretKey")
+
+    # MongoDB URI, including the name of the default database
+    app.config["MONGODB_URI"] = db.models.MONGODB_URI
+
+    # Create indexes while starting up (off by default; run `flask init-db` on deploy)
+    app.config["DB_INIT_ON_STARTUP"] = (
+        os.getenv("DB_INIT_ON_STARTUP", "false").lower() == "true"
+    )
+
+    # Apply configuration overrides
+    if config:
+        app.config.update(config)
+
+    # Point the data layer at the configured database (connects lazily)
+    db.configure(app.config["MONGODB_URI"])
+
+    # Initialize JWT extension with the Flask app
+    jwt = JWTManager(app)
+    jwt.token_in_blocklist_loader(check_if_token_in_blacklist)
+
+    # Import the blueprints here so importing this module stays cheap
+    from api import api_bp
+    from auth import auth_bp
+
+    # Register the API blueprint with URL prefix '/api'
+    app.register_blueprint(api_bp, url_prefix="/api")
+
+    # Register the authentication blueprint with URL prefix '/auth'
+    app.register_blueprint(auth_bp, url_prefix="/auth")
+
+    # Register the command creating the database indexes
+    app.cli.add_command(init_db_command)
+
+    if app.config["DB_INIT_ON_STARTUP"]:
+        try:
+            db.ensure_indexes()
+        except db.DuplicateShortUrls as e:
+            # Serve anyway; the unique index is created once the duplicates are resolved
+            app.logger.error(str(e))
+        except PyMongoError as e:
+            # Serve anyway; decodes can still fall back to the local snapshot
+            app.logger.error(f"Could not create database indexes: {e}")
+
+    # Start the background work once, when the first request is served
+    background_lock = threading.Lock()
+    background_started = threading.Event()
+
+    @app.before_request
+    def start_background_tasks():
+        if background_started.is_set():
+            return
+
+        with background_lock:
+            if background_started.is_set():
+                return
+
+            # Replay and start the write-behind queue, if enabled
+            db.start_background_tasks()
+
+            # Start probing the long URLs of new mappings, if enabled
+            from api.validation import validation_pipeline
+
+            if validation_pipeline:
+                validation_pipeline.start()
+
+            background_started.set()
+
+    return app
 
-# Register the authentication blueprint with URL prefix '/auth'
-app.register_blueprint(auth_bp, url_prefix="/auth")
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -2,7 +2,7 @@ from flask import jsonify, request
 from auth import auth_bp
 from flask_jwt_extended import create_access_token
 from datetime import timedelta
-from db import user_collection
+from db import user_read_collection
 import hashlib
 
 # Define token expiry duration as 5 hours
@@ -56,7 +56,7 @@ def login():
             raise ValueError("Username or password not provided")
 
         # Find user by username in the database
-        user = user_collection.find_one({"username": username})
+        user = user_read_collection.find_one({"username": username})
 
         # Check if user doesn't exist or password is incorrect
         if (
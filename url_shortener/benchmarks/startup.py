@@ -0,0 +1,71 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Directory containing app.py, used as the working directory of each cold start
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Program run in a fresh interpreter to time one cold start
+COLD_START = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({"DB_INIT_ON_STARTUP": False})
+created = time.perf_counter()
+print(imported - start, created - imported)
+"""
+
+
+def measure(runs):
+    """
+    Time the cold start of the application in fresh interpreters.
+
+    Each run starts a new Python process, so module caches are cold and the
+    measured time matches what a newly scheduled worker pays before serving.
+
+    Args:
+    - runs (int): The number of cold starts to measure.
+
+    Returns:
+    - tuple: Lists of import times and app creation times, in seconds.
+    """
+    import_times = []
+    create_times = []
+
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START],
+            cwd=APP_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        import_time, create_time = map(float, output.split())
+        import_times.append(import_time)
+        create_times.append(create_time)
+
+    return import_times, create_times
+
+
+def report(label, times):
+    """
+    Print the median and worst time of a series of measurements in milliseconds.
+    """
+    print(
+        f"{label:<12} median {statistics.median(times) * 1000:8.1f} ms"
+        f"   max {max(times) * 1000:8.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark application cold start")
+    parser.add_argument("--runs", type=int, default=20, help="number of cold starts")
+    args = parser.parse_args()
+
+    import_times, create_times = measure(args.runs)
+    report("import", import_times)
+    report("create_app", create_times)
+    report("total", [i + c for i, c in zip(import_times, create_times)])
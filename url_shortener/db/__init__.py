@@ -1,2 +1,39 @@
-# Import collections from the models module
-from .models import user_collection, url_collection, revoked_token_collection
+# Import collections and lifecycle functions from the models module
+from .models import (
+    DuplicateShortUrls,
+    configure,
+    dedupe_short_urls,
+    ensure_indexes,
+    find_duplicate_short_urls,
+    get_client,
+    start_background_tasks,
+    user_collection,
+    url_collection,
+    revoked_token_collection,
+    click_stats_collection,
+    keyspace,
+    user_read_collection,
+    revoked_token_read_collection,
+    write_behind_queue,
+)
+
+# Import the error raised when MongoDB is unavailable from the breaker module
+from .breaker import DatabaseUnavailable
+
+# Import URL mapping helpers from the mappings module
+from .mappings import (
+    find_links_by_owner,
+    find_mapping,
+    find_owned_mapping,
+    find_short_urls_with_prefix,
+    lookup_short_url,
+    set_mapping_status,
+    store_mapping,
+    taken_short_urls,
+)
+
+# Import click analytics helpers from the analytics module
+from .analytics import GRANULARITIES, get_click_counts, record_click
+
+# Import the revoked token check from the tokens module
+from .tokens import is_token_revoked
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+from .models import click_counter, click_stats_collection
+
+# Bucket sizes of the click rollups and how long each is kept (None keeps it forever)
+GRANULARITIES = {
+    "minute": (timedelta(minutes=1), timedelta(days=2)),
+    "hour": (timedelta(hours=1), timedelta(days=90)),
+    "day": (timedelta(days=1), None),
+}
+
+
+def bucket_start(timestamp, granularity):
+    """
+    Return the start of the bucket containing a timestamp.
+
+    Args:
+    - timestamp (datetime): A timezone-aware timestamp.
+    - granularity (str): One of "minute", "hour" or "day".
+
+    Returns:
+    - datetime: The start of the bucket, in UTC.
+    """
+    step = int(GRANULARITIES[granularity][0].total_seconds())
+    seconds = int(timestamp.timestamp()) // step * step
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def record_click(short_url, timestamp=None):
+    """
+    Count a click on a short URL in its minute, hour and day buckets.
+
+    The click is only added to in-memory counters, so the decode path never
+    waits on a write to the primary. The counters are flushed in the background
+    as one unordered bulk write of `$inc` updates, one per bucket that received
+    clicks, however many clicks it received.
+
+    Args:
+    - short_url (str): The short URL identifier that was clicked.
+    - timestamp (datetime): When the click happened, defaults to now.
+    """
+    timestamp = timestamp or datetime.now(timezone.utc)
+
+    buckets = []
+    for granularity, (_, retention) in GRANULARITIES.items():
+        bucket = bucket_start(timestamp, granularity)
+        # Let the TTL index drop fine-grained buckets once they are no longer kept
+        expires_at = bucket + retention if retention is not None else None
+        buckets.append((short_url, granularity, bucket, expires_at))
+
+    click_counter.add(buckets)
+
+
+def get_click_counts(short_url, granularity, start, end):
+    """
+    Return the click counts of a short URL for every bucket in a time range.
+
+    Only the rollup documents of the requested granularity are read, so the
+    cost is bounded by the number of buckets in the range, not by the number
+    of clicks.
+
+    Args:
+    - short_url (str): The short URL identifier.
+    - granularity (str): One of "minute", "hour" or "day".
+    - start (datetime): The start of the range (inclusive), timezone-aware.
+    - end (datetime): The end of the range (exclusive), timezone-aware.
+
+    Returns:
+    - list: Tuples of bucket start and click count, in chronological order,
+      including buckets without clicks.
+    """
+    step = GRANULARITIES[granularity][0]
+    first_bucket = bucket_start(start, granularity)
+
+    rollups = click_stats_collection.find(
+        {
+            "short_url": short_url,
+            "granularity": granularity,
+            "bucket": {"$gte": first_bucket, "$lt": end},
+        },
+        {"_id": 0, "bucket": 1, "count": 1},
+    )
+
+    # MongoDB returns naive UTC datetimes
+    counts = {
+        rollup["bucket"].replace(tzinfo=timezone.utc): rollup["count"]
+        for rollup in rollups
+    }
+
+    buckets = []
+    bucket = first_bucket
+    while bucket < end:
+        buckets.append((bucket, counts.get(bucket, 0)))
+        bucket += step
+    return buckets
@@ -0,0 +1,156 @@
+from pymongo.errors import ConnectionFailure, PyMongoError
+import pymongo
+import threading
+import time
+
+
+class DatabaseUnavailable(Exception):
+    """
+    Raised when MongoDB is considered unavailable, either because an operation
+    just failed or timed out, or because the circuit breaker is open.
+    """
+
+
+def is_availability_error(error):
+    """
+    Check whether a pymongo error means the database is unreachable or too slow.
+
+    Errors such as duplicate keys are answers from a healthy database and must
+    not trip the circuit breaker.
+
+    Args:
+    - error (PyMongoError): The error raised by pymongo.
+
+    Returns:
+    - bool: True for connection failures and timeouts.
+    """
+    return isinstance(error, ConnectionFailure) or getattr(error, "timeout", False)
+
+
+class CircuitBreaker:
+    """
+    Stop sending operations to MongoDB after repeated failures.
+
+    The breaker is closed while operations succeed. After `failure_threshold`
+    consecutive availability errors it opens, and every call fails immediately
+    with DatabaseUnavailable instead of waiting for a timeout. Once
+    `reset_timeout` seconds have passed, a single trial call is let through
+    (half-open): if it succeeds the breaker closes, otherwise it opens again.
+
+    Args:
+    - failure_threshold (int): Consecutive failures that open the breaker.
+    - reset_timeout (float): Seconds the breaker stays open before a trial call.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        """
+        True while calls are being rejected without reaching the database.
+        """
+        with self._lock:
+            return (
+                self._opened_at is not None
+                and time.monotonic() - self._opened_at < self.reset_timeout
+            )
+
+    def call(self, operation, *args, **kwargs):
+        """
+        Run a database operation through the breaker.
+
+        Args:
+        - operation (function): The function performing the database operation.
+        - args, kwargs: Arguments passed to the operation.
+
+        Returns:
+        - The result of the operation.
+
+        Raises:
+        - DatabaseUnavailable: If the breaker is open, or if the operation failed
+          because the database is unreachable or timed out.
+        - PyMongoError: Other errors raised by the operation are passed through.
+        """
+        self._before_call()
+
+        try:
+            result = operation(*args, **kwargs)
+        except PyMongoError as error:
+            if not is_availability_error(error):
+                self._record_success()
+                raise
+            self._record_failure()
+            raise DatabaseUnavailable(str(error)) from error
+        except BaseException:
+            self._release_trial()
+            raise
+
+        self._record_success()
+        return result
+
+    def _before_call(self):
+        """
+        Reject the call if the breaker is open, or claim the half-open trial call.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise DatabaseUnavailable("Circuit breaker is open")
+
+            # Half-open: only one trial call at a time may probe the database
+            if self._trial_running:
+                raise DatabaseUnavailable("Circuit breaker is open")
+            self._trial_running = True
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def _release_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+
+def guarded(breaker, deadline, operation, *args, **kwargs):
+    """
+    Run a database operation with a deadline, through a circuit breaker.
+
+    The deadline uses pymongo's client-side operation timeout, so it bounds the
+    whole operation, including server selection and retries.
+
+    Args:
+    - breaker (CircuitBreaker): The breaker protecting the database.
+    - deadline (float): Maximum duration of the operation in seconds.
+    - operation (function): The function performing the database operation.
+    - args, kwargs: Arguments passed to the operation.
+
+    Returns:
+    - The result of the operation.
+
+    Raises:
+    - DatabaseUnavailable: If the breaker is open, or the operation failed or
+      missed its deadline because of the database.
+    """
+
+    def with_deadline():
+        with pymongo.timeout(deadline):
+            return operation(*args, **kwargs)
+
+    return breaker.call(with_deadline)
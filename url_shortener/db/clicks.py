@@ -0,0 +1,157 @@
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+import threading
+from .breaker import guarded
+
+
+class ClickCounter:
+    """
+    Aggregate click increments in memory and flush them to MongoDB periodically.
+
+    Counting a click only increments in-memory counters, so decodes never wait
+    on a write to the primary. Every `flush_interval` seconds a background
+    thread sends all accumulated increments in one unordered bulk write, one
+    `$inc` per rollup bucket however many clicks it received. Increments that
+    cannot be written are kept and retried on the next flush; clicks counted
+    since the last flush are lost if the process crashes.
+
+    Args:
+    - collection (Collection): The collection of click rollup documents.
+    - breaker (CircuitBreaker): The breaker the writes go through.
+    - deadline (float): Maximum duration of one bulk write in seconds.
+    - flush_interval (float): Seconds between flushes.
+    - batch_size (int): Maximum number of bucket updates in one bulk write.
+    """
+
+    def __init__(
+        self, collection, breaker, deadline, flush_interval=1.0, batch_size=1000
+    ):
+        self.collection = collection
+        self.breaker = breaker
+        self.deadline = deadline
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        # Pending increments keyed by (short_url, granularity, bucket), with the
+        # expiry of each bucket
+        self._counts = {}
+        self._expiries = {}
+
+        # Guards the pending increments
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def add(self, buckets):
+        """
+        Count one click in each of the given rollup buckets.
+
+        Args:
+        - buckets (list): Tuples of short URL, granularity, bucket start and
+          expiry (None for buckets kept forever).
+        """
+        with self._lock:
+            for short_url, granularity, bucket, expires_at in buckets:
+                key = (short_url, granularity, bucket)
+                self._counts[key] = self._counts.get(key, 0) + 1
+                self._expiries[key] = expires_at
+
+    def start(self):
+        """
+        Start the background flusher thread.
+        """
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run, name="click-counter-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the flusher thread and flush the remaining increments.
+        """
+        if self._thread is None:
+            return
+
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def flush(self):
+        """
+        Write all pending increments with unordered bulk writes.
+
+        Raises:
+        - DatabaseUnavailable: If MongoDB is unavailable or too slow to answer;
+          the increments are kept for the next flush.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            expiries, self._expiries = self._expiries, {}
+
+        updates = []
+        for (short_url, granularity, bucket), count in counts.items():
+            update = {"$inc": {"count": count}}
+
+            # Let the TTL index drop fine-grained buckets once they are no longer kept
+            expires_at = expiries[(short_url, granularity, bucket)]
+            if expires_at is not None:
+                update["$setOnInsert"] = {"expires_at": expires_at}
+
+            bucket_filter = {
+                "short_url": short_url,
+                "granularity": granularity,
+                "bucket": bucket,
+            }
+            updates.append(UpdateOne(bucket_filter, update, upsert=True))
+
+        keys = list(counts)
+        for start in range(0, len(updates), self.batch_size):
+            end = start + self.batch_size
+            try:
+                guarded(
+                    self.breaker,
+                    self.deadline,
+                    self.collection.bulk_write,
+                    updates[start:end],
+                    ordered=False,
+                )
+            except BulkWriteError as bwe:
+                # The other updates of an unordered bulk write were applied
+                failed = [
+                    keys[start + error["index"]]
+                    for error in bwe.details.get("writeErrors", [])
+                ]
+                self._restore(failed + keys[end:], counts, expiries)
+                raise
+            except Exception:
+                # Keep the increments not known to be written for the next flush
+                self._restore(keys[start:], counts, expiries)
+                raise
+
+    def _restore(self, keys, counts, expiries):
+        """
+        Add back increments that could not be written.
+        """
+        with self._lock:
+            for key in keys:
+                self._counts[key] = self._counts.get(key, 0) + counts[key]
+                self._expiries[key] = expiries[key]
+
+    def _run(self):
+        """
+        Flush pending increments every interval until the counter is stopped.
+        """
+        while not self._stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # The increments are kept; the next pass retries them
+                continue
@@ -0,0 +1,310 @@
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo import ReturnDocument
+import re
+import threading
+
+# Characters allowed in a short code alphabet (they must not need escaping in a URL path)
+URL_SAFE_CHARACTERS = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.~"
+)
+
+# Id of the settings document holding the shared keyspace state
+KEYSPACE_DOCUMENT_ID = "keyspace"
+
+# Window used to measure the rate at which new short URLs are created
+CREATION_RATE_WINDOW = timedelta(hours=1)
+
+
+def validate_alphabet(alphabet):
+    """
+    Check that a short code alphabet is usable.
+
+    Args:
+    - alphabet (str): The characters short codes are made of.
+
+    Raises:
+    - ValueError: If the alphabet has fewer than two characters, repeats a
+      character, or contains characters that are not URL-safe.
+    """
+    if len(alphabet) < 2 or len(set(alphabet)) != len(alphabet):
+        raise ValueError("Short code alphabet needs at least two distinct characters")
+
+    if not set(alphabet) <= URL_SAFE_CHARACTERS:
+        raise ValueError("Short code alphabet may only contain URL-safe characters")
+
+
+class Keyspace:
+    """
+    Track how much of the short code keyspace is used, and grow the code length.
+
+    The current code length is shared by all processes through a settings
+    document. Every process counts the codes it generates, per code length, in
+    memory. A background thread adds these counts to the settings document every
+    `refresh_interval` seconds, and when the codes generated at the current
+    length fill more than `growth_threshold` of its capacity it raises the
+    length by one with an atomic `$max` update, so concurrent processes never
+    shrink it. An encode that finds no free code triggers a refresh right away.
+    Only generated codes count towards the capacity of their length:
+    custom aliases and shorter codes from before a growth do not compete with
+    them. Encode requests only read the cached length and never wait on the
+    database.
+
+    Args:
+    - settings_collection (Collection): Collection holding the keyspace document.
+    - url_collection (Collection): Collection of URL mappings.
+    - alphabet (str): The characters short codes are made of.
+    - min_length (int): The initial and minimum short code length.
+    - growth_threshold (float): Utilization above which the length grows.
+    - refresh_interval (float): Seconds between refreshes of the shared state.
+    """
+
+    def __init__(
+        self,
+        settings_collection,
+        url_collection,
+        alphabet,
+        min_length=8,
+        growth_threshold=0.5,
+        refresh_interval=60.0,
+    ):
+        validate_alphabet(alphabet)
+        self.settings_collection = settings_collection
+        self.url_collection = url_collection
+        self.alphabet = alphabet
+        self.min_length = min_length
+        self.growth_threshold = growth_threshold
+        self.refresh_interval = refresh_interval
+
+        self._length = min_length
+        # Encode statistics not yet added to the settings document
+        self._generated = {}
+        self._encodes = 0
+        self._collision_retries = 0
+        self._lock = threading.Lock()
+        # Wakes the background thread early, e.g. when no free code was found
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def length(self):
+        """
+        The length of newly generated short codes, as of the last refresh.
+        """
+        return self._length
+
+    def capacity(self, length):
+        """
+        Return the number of distinct short codes of a given length.
+        """
+        return len(self.alphabet) ** length
+
+    def record_encode(self, collision_retries, length=None):
+        """
+        Count an encode and the collisions it ran into.
+
+        Args:
+        - collision_retries (int): The number of generated codes that were taken.
+        - length (int): The length of the generated code that was stored, or
+          None if no free code was found.
+        """
+        with self._lock:
+            self._encodes += 1
+            self._collision_retries += collision_retries
+            if length is not None:
+                self._generated[length] = self._generated.get(length, 0) + 1
+
+        if length is None:
+            # The current length may be full; refresh without waiting for the interval
+            self._wakeup.set()
+
+    def start(self):
+        """
+        Load the shared keyspace state, then keep refreshing it in a background thread.
+        """
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run, name="keyspace-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread and publish the remaining encode statistics.
+        """
+        if self._thread is None:
+            return
+
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+        try:
+            self.refresh()
+        except Exception:
+            pass
+
+    def refresh(self):
+        """
+        Publish local encode statistics, grow the code length if needed, and
+        reload the shared keyspace state.
+
+        Returns:
+        - dict: The keyspace settings document.
+        """
+        with self._lock:
+            generated, self._generated = self._generated, {}
+            encodes, self._encodes = self._encodes, 0
+            collision_retries, self._collision_retries = self._collision_retries, 0
+
+        increments = {
+            "encodes": encodes,
+            "collision_retries": collision_retries,
+        }
+        for length, count in generated.items():
+            increments[f"generated.{length}"] = count
+
+        try:
+            settings = self.settings_collection.find_one_and_update(
+                {"_id": KEYSPACE_DOCUMENT_ID},
+                {"$max": {"length": self.min_length}, "$inc": increments},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception:
+            # Keep the statistics for the next refresh
+            self._restore_statistics(generated, encodes, collision_retries)
+            raise
+
+        # The published counts may start from this process's own encodes, so
+        # whether the stored codes were counted is tracked by a separate flag
+        length = max(settings["length"], self.min_length)
+        if not settings.get("seeded", {}).get(str(length)):
+            settings = self._count_existing_codes(length)
+
+        used = settings["generated"][str(length)]
+        if used / self.capacity(length) > self.growth_threshold:
+            settings = self.settings_collection.find_one_and_update(
+                {"_id": KEYSPACE_DOCUMENT_ID},
+                {"$max": {"length": length + 1}},
+                return_document=ReturnDocument.AFTER,
+            )
+
+        self._length = max(settings["length"], self.min_length)
+        return settings
+
+    def _count_existing_codes(self, length):
+        """
+        Initialize the count of generated codes of a length from the stored mappings.
+
+        This runs once per length, for codes generated before the counts were
+        kept, and marks the length as seeded. Published counts only cover codes
+        that are stored as well, so the `$max` update counts every code once.
+
+        Returns:
+        - dict: The updated keyspace settings document.
+        """
+        pattern = f"^[{re.escape(self.alphabet)}]{{{length}}}$"
+        count = self.url_collection.count_documents({"short_url": {"$regex": pattern}})
+
+        return self.settings_collection.find_one_and_update(
+            {"_id": KEYSPACE_DOCUMENT_ID},
+            {
+                "$max": {f"generated.{length}": count},
+                "$set": {f"seeded.{length}": True},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _restore_statistics(self, generated, encodes, collision_retries):
+        """
+        Add back encode statistics that could not be published.
+        """
+        with self._lock:
+            for length, count in generated.items():
+                self._generated[length] = self._generated.get(length, 0) + count
+            self._encodes += encodes
+            self._collision_retries += collision_retries
+
+    def metrics(self):
+        """
+        Report keyspace utilization, collision statistics and projected exhaustion.
+
+        The report is computed from the shared keyspace state without changing
+        it, so it only includes the encode statistics published by the last
+        refresh of each process.
+
+        Returns:
+        - dict: The keyspace metrics.
+        """
+        settings = (
+            self.settings_collection.find_one({"_id": KEYSPACE_DOCUMENT_ID}) or {}
+        )
+        length = max(settings.get("length", self.min_length), self.min_length)
+        capacity = self.capacity(length)
+        used = settings.get("generated", {}).get(str(length), 0)
+        utilization = used / capacity
+
+        # Creation rate over the last hour, counted on the _id index
+        since = ObjectId.from_datetime(
+            datetime.now(timezone.utc) - CREATION_RATE_WINDOW
+        )
+        created = self.url_collection.count_documents({"_id": {"$gte": since}})
+        rate = created / CREATION_RATE_WINDOW.total_seconds()
+
+        encodes = settings.get("encodes", 0)
+        collision_retries = settings.get("collision_retries", 0)
+
+        return {
+            "alphabet_size": len(self.alphabet),
+            "code_length": length,
+            "capacity": capacity,
+            "used": used,
+            "utilization": utilization,
+            "growth_threshold": self.growth_threshold,
+            # A random code collides with probability equal to the utilization
+            "collision_probability": utilization,
+            "collision_retries_per_encode": (
+                collision_retries / encodes if encodes else 0.0
+            ),
+            "creation_rate_per_second": rate,
+            "projected_growth_at": self._projection(
+                capacity * self.growth_threshold - used, rate
+            ),
+            "projected_exhaustion_at": self._projection(capacity - used, rate),
+        }
+
+    def _projection(self, remaining, rate):
+        """
+        Return when `remaining` codes will be used at the current rate, as ISO 8601.
+        """
+        now = datetime.now(timezone.utc)
+        if rate <= 0:
+            return None
+        if remaining <= 0:
+            return now.isoformat()
+
+        seconds = remaining / rate
+        # Projections past the year 9999 cannot be represented and are not useful
+        if seconds >= (datetime.max.replace(tzinfo=timezone.utc) - now).total_seconds():
+            return None
+        return (now + timedelta(seconds=seconds)).isoformat()
+
+    def _run(self):
+        """
+        Refresh the shared keyspace state every interval until stopped.
+        """
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                # Keep generating codes of the cached length; the next pass retries
+                pass
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
@@ -0,0 +1,273 @@
+import re
+from .breaker import DatabaseUnavailable, guarded
+from .models import (
+    READ_DEADLINE,
+    database_breaker,
+    local_snapshot,
+    primary_breaker,
+    url_collection,
+    url_read_collection,
+    recent_codes,
+    write_behind_queue,
+)
+
+
+def find_mapping(field, value):
+    """
+    Find a URL mapping by one of its fields, including mappings not yet flushed.
+
+    Args:
+    - field (str): The field to match, such as "short_url".
+    - value (str): The value the field must be equal to.
+
+    Returns:
+    - dict: The matching URL mapping, or None if no mapping matches.
+
+    Raises:
+    - DatabaseUnavailable: If MongoDB is unavailable or too slow to answer.
+    """
+    # Mappings buffered by the write-behind queue are not in the database yet
+    if write_behind_queue and field == "short_url":
+        mapping = write_behind_queue.find_by_short_url(value)
+        if mapping:
+            return mapping
+
+    # Read from the primary, which has every stored mapping
+    return guarded(
+        primary_breaker, READ_DEADLINE, url_collection.find_one, {field: value}
+    )
+
+
+def find_owned_mapping(long_url, owner):
+    """
+    Find the URL mapping a user created for a long URL, including mappings not
+    yet flushed.
+
+    Mappings are deduplicated per user rather than globally, so every user who
+    shortens a URL owns a mapping for it, listed with their links.
+
+    Args:
+    - long_url (str): The long URL of the mapping.
+    - owner (str): The username that created the mapping.
+
+    Returns:
+    - dict: The matching URL mapping, or None if the user has no mapping for
+      the long URL.
+
+    Raises:
+    - DatabaseUnavailable: If MongoDB is unavailable or too slow to answer.
+    """
+    # Mappings buffered by the write-behind queue are not in the database yet
+    if write_behind_queue:
+        mapping = write_behind_queue.find_by_long_url(long_url, owner)
+        if mapping:
+            return mapping
+
+    # Read from the primary, served by the (long_url, owner) index
+    return guarded(
+        primary_breaker,
+        READ_DEADLINE,
+        url_collection.find_one,
+        {"long_url": long_url, "owner": owner},
+    )
+
+
+def lookup_short_url(short_url):
+    """
+    Find the URL mapping for a short URL using the decode read preference.
+
+    Lookups are routed according to the decode read preference, so they can be
+    served by secondaries. A miss is only retried against the primary when the
+    short URL was created recently by this process, since a secondary may not
+    have replicated it yet.
+
+    Args:
+    - short_url (str): The short URL identifier to look up.
+
+    While MongoDB is unavailable, the lookup is answered from the local
+    snapshot, if one is configured and contains the short URL.
+
+    Returns:
+    - dict: The matching URL mapping, or None if the short URL does not exist.
+
+    Raises:
+    - DatabaseUnavailable: If MongoDB is unavailable and the short URL cannot be
+      found in the local snapshot.
+    """
+    # Mappings buffered by the write-behind queue are not in the database yet
+    if write_behind_queue:
+        mapping = write_behind_queue.find_by_short_url(short_url)
+        if mapping:
+            return mapping
+
+    try:
+        mapping = guarded(
+            database_breaker,
+            READ_DEADLINE,
+            url_read_collection.find_one,
+            {"short_url": short_url},
+        )
+
+        if not mapping and short_url in recent_codes:
+            # The secondary may be lagging behind; ask the primary, through its own
+            # breaker so an election does not block lookups secondaries can serve
+            mapping = guarded(
+                primary_breaker,
+                READ_DEADLINE,
+                url_collection.find_one,
+                {"short_url": short_url},
+            )
+
+        return mapping
+    except DatabaseUnavailable:
+        # Fall back to the local snapshot while the database is unavailable
+        long_url = local_snapshot.lookup(short_url) if local_snapshot else None
+        if long_url is None:
+            raise
+        return {"short_url": short_url, "long_url": long_url}
+
+
+def store_mapping(mapping, write_behind=True):
+    """
+    Store a new URL mapping, either directly or through the write-behind queue.
+
+    Args:
+    - mapping (dict): The URL mapping document to store.
+    - write_behind (bool): Whether the mapping may be buffered by the write-behind
+      queue. Pass False when the insert must be checked against the unique
+      short_url index before answering, as for custom aliases.
+
+    Raises:
+    - DuplicateKeyError: If the mapping is inserted directly and its short URL
+      is already taken.
+    - DatabaseUnavailable: If the mapping is inserted directly and MongoDB is
+      unavailable.
+    """
+    if write_behind and write_behind_queue:
+        # Serve the mapping from memory and let the flusher insert it in a batch
+        write_behind_queue.enqueue(mapping)
+    else:
+        # Insert the mapping into the database right away
+        primary_breaker.call(url_collection.insert_one, mapping)
+
+    # Remember the short URL so decode can fall back to the primary while it replicates
+    recent_codes.add(mapping["short_url"])
+
+
+def set_mapping_status(short_url, fields):
+    """
+    Record the outcome of validating the long URL of a mapping.
+
+    Args:
+    - short_url (str): The short URL of the mapping.
+    - fields (dict): The validation fields to set, such as `status`.
+    """
+    # A mapping still buffered by the write-behind queue is flushed with its status
+    if write_behind_queue:
+        write_behind_queue.update_pending(short_url, fields)
+
+    # The mapping may have been flushed meanwhile, so update the stored copy too
+    url_collection.update_one({"short_url": short_url}, {"$set": fields})
+
+
+def taken_short_urls(short_urls):
+    """
+    Return which of the given short URLs are already taken.
+
+    Args:
+    - short_urls (list): The short URLs to check.
+
+    Returns:
+    - set: The short URLs that are stored or pending in the write-behind queue.
+    """
+    taken = set()
+
+    if write_behind_queue:
+        taken.update(
+            short_url
+            for short_url in short_urls
+            if write_behind_queue.find_by_short_url(short_url)
+        )
+
+    # One exact-match lookup per candidate on the unique short_url index
+    taken.update(
+        mapping["short_url"]
+        for mapping in url_collection.find(
+            {"short_url": {"$in": list(short_urls)}}, {"_id": 0, "short_url": 1}
+        )
+    )
+    return taken
+
+
+def find_short_urls_with_prefix(prefix, limit):
+    """
+    Return stored short URLs starting with a prefix, in lexicographic order.
+
+    An anchored, case-sensitive regular expression is turned by MongoDB into a
+    bounded range scan of the short_url index, and the projection only needs
+    the indexed field, so the query is covered by the index.
+
+    Args:
+    - prefix (str): The prefix the short URLs start with.
+    - limit (int): The maximum number of short URLs returned.
+
+    Returns:
+    - list: The matching short URLs.
+    """
+    cursor = (
+        url_collection.find(
+            {"short_url": {"$regex": f"^{re.escape(prefix)}"}},
+            {"_id": 0, "short_url": 1},
+        )
+        .sort("short_url", 1)
+        .limit(limit)
+    )
+    return [mapping["short_url"] for mapping in cursor]
+
+
+def find_links_by_owner(owner, before_id=None, limit=20):
+    """
+    Return a page of the URL mappings created by a user, newest first.
+
+    Pages are selected with keyset pagination on the `(owner, _id)` index: the
+    query starts right after the last `_id` of the previous page instead of
+    skipping over it, so every page costs the same regardless of its position.
+
+    Args:
+    - owner (str): The username that created the mappings.
+    - before_id (ObjectId): The `_id` of the last mapping of the previous page,
+      or None for the first page.
+    - limit (int): The maximum number of mappings returned.
+
+    Returns:
+    - list: URL mappings containing only the `_id`, `short_url`, `long_url` and
+      `status` fields.
+    """
+    query = {"owner": owner}
+    if before_id is not None:
+        query["_id"] = {"$lt": before_id}
+
+    # Fields returned for each link
+    fields = ("_id", "short_url", "long_url", "status")
+
+    links = list(
+        url_collection.find(query, {field: 1 for field in fields})
+        .sort("_id", -1)
+        .limit(limit)
+    )
+
+    # Include mappings still buffered by the write-behind queue
+    if write_behind_queue:
+        stored_ids = {link["_id"] for link in links}
+        pending = [
+            {field: mapping.get(field) for field in fields}
+            for mapping in write_behind_queue.pending_mappings()
+            if mapping.get("owner") == owner
+            and mapping["_id"] not in stored_ids
+            and (before_id is None or mapping["_id"] < before_id)
+        ]
+        if pending:
+            links = sorted(links + pending, key=lambda link: link["_id"], reverse=True)
+            links = links[:limit]
+
+    return links
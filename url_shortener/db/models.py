@@ -1,24 +1,177 @@
 from datetime import timedelta
+import atexit
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+from .breaker import CircuitBreaker
+from .clicks import ClickCounter
+from .keyspace import Keyspace
+from .routing import RecentCodes, read_preference
+from .snapshot import LocalSnapshot, SnapshotRefresher
+from .write_behind import WriteBehindQueue
 import os
+import string
+import threading
 
 # Get MongoDB URI from environment variable, default to localhost if not set
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/url_shortener")
 
-# Connect to MongoDB
-client = MongoClient(MONGODB_URI)
+# Time limits (milliseconds) for finding a server, connecting, and waiting on a socket
+SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "2000")
+)
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "2000"))
+SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "5000"))
+
+# Deadline (seconds) for the database operations on the request path of decodes
+READ_DEADLINE = float(os.getenv("DB_READ_DEADLINE_SECONDS", "0.5"))
+
+# MongoDB client, created on first use so importing this module never touches the network
+client = None
+
+# Bumped whenever the client is replaced, so cached collections know to re-resolve
+client_generation = 0
+
+# Guards creation and replacement of the client
+client_lock = threading.Lock()
+
+
+def configure(uri):
+    """
+    Point the data layer at a MongoDB instance.
+
+    Any existing client is closed; a new one is created on the next database access.
+
+    Args:
+    - uri (str): The MongoDB connection URI, including the default database name.
+    """
+    global MONGODB_URI, client, client_generation
+
+    with client_lock:
+        if client is not None and uri != MONGODB_URI:
+            client.close()
+            client = None
+            client_generation += 1
+        MONGODB_URI = uri
+
+
+def get_client():
+    """
+    Return the MongoDB client, creating it on first use.
+
+    The client is created with `connect=False`, so no connection is opened
+    until the first operation is actually sent to the server. Its timeouts
+    replace pymongo's 30-second defaults so a stalled server fails fast.
+
+    Returns:
+    - MongoClient: The shared MongoDB client.
+    """
+    global client
+
+    if client is None:
+        with client_lock:
+            if client is None:
+                client = MongoClient(
+                    MONGODB_URI,
+                    connect=False,
+                    serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=SOCKET_TIMEOUT_MS,
+                )
+    return client
+
+
+def get_database():
+    """
+    Return the default database named in the MongoDB URI.
+    """
+    return get_client().get_default_database()
+
+
+class LazyCollection:
+    """
+    Stand-in for a MongoDB collection that is resolved on first use.
+
+    Attribute access is forwarded to the real collection, so a LazyCollection
+    can be used anywhere a pymongo Collection is expected.
+
+    Args:
+    - name (str): The name of the collection in the default database.
+    - options: Keyword arguments passed to `Collection.with_options`, such as
+      `read_preference`.
+    """
+
+    def __init__(self, name, **options):
+        self.name = name
+        self.options = options
+        self._collection = None
+        self._generation = None
+
+    def resolve(self):
+        """
+        Return the underlying pymongo collection for the current client.
+        """
+        if self._collection is None or self._generation != client_generation:
+            collection = get_database()[self.name]
+            if self.options:
+                collection = collection.with_options(**self.options)
+            self._collection = collection
+            self._generation = client_generation
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
 
-# Get the default database
-db = client.get_default_database()
 
 # Collection for storing user data
-user_collection = db["users"]
+user_collection = LazyCollection("users")
 
 # Collection for storing URL mappings
-url_collection = db["urls"]
+url_collection = LazyCollection("urls")
 
 # Collection for storing revoked tokens
-revoked_token_collection = db["revoked_tokens"]
+revoked_token_collection = LazyCollection("revoked_tokens")
+
+# Collection for storing per-link click counts rolled up by minute, hour and day
+click_stats_collection = LazyCollection("click_stats")
+
+# Collection for storing application settings shared by all processes
+settings_collection = LazyCollection("settings")
+
+# Collection keeping the URL mappings removed when deduplicating short URLs
+duplicate_url_collection = LazyCollection("url_duplicates")
+
+# Read preference for short URL lookups when decoding
+DECODE_READ_PREFERENCE = os.getenv("DECODE_READ_PREFERENCE", "secondaryPreferred")
+
+# Maximum replication lag (seconds) tolerated for secondaries serving decodes
+DECODE_MAX_STALENESS = int(os.getenv("DECODE_MAX_STALENESS_SECONDS", "90"))
+
+# Read preference for user lookups when logging in
+LOGIN_READ_PREFERENCE = os.getenv("LOGIN_READ_PREFERENCE", "primary")
+
+# Read preference for the revoked token check on every authenticated request
+BLOCKLIST_READ_PREFERENCE = os.getenv("BLOCKLIST_READ_PREFERENCE", "primary")
+
+# URL mappings as seen by decode, possibly served by a secondary
+url_read_collection = LazyCollection(
+    "urls",
+    read_preference=read_preference(DECODE_READ_PREFERENCE, DECODE_MAX_STALENESS),
+)
+
+# User data as seen by login
+user_read_collection = LazyCollection(
+    "users", read_preference=read_preference(LOGIN_READ_PREFERENCE)
+)
+
+# Revoked tokens as seen by the blocklist check
+revoked_token_read_collection = LazyCollection(
+    "revoked_tokens", read_preference=read_preference(BLOCKLIST_READ_PREFERENCE)
+)
+
+# Short URLs created by this process that secondaries may not have replicated yet
+recent_codes = RecentCodes(
+    window=float(os.getenv("RECENT_CODE_WINDOW_SECONDS", DECODE_MAX_STALENESS))
+)
 
 # Expiry duration for JWT tokens
 TOKEN_EXPIRY_DURATION = timedelta(hours=5)
@@ -26,5 +179,250 @@ TOKEN_EXPIRY_DURATION = timedelta(hours=5)
 # Convert expiry duration to seconds
 expiry_seconds = TOKEN_EXPIRY_DURATION.total_seconds()
 
-# Create index on 'created_at' field in revoked token collection for automatic expiration
-revoked_token_collection.create_index("created_at", expireAfterSeconds=expiry_seconds)
+# Circuit breaker for reads that secondaries can serve, such as decode lookups
+database_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("DB_BREAKER_RESET_SECONDS", "10")),
+)
+
+# Circuit breaker for operations that need the primary: writes, and reads routed
+# to the primary. It is kept apart from the breaker of decode reads, so primary
+# operations failing during an election do not block decodes that secondaries
+# can still serve.
+primary_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("DB_BREAKER_RESET_SECONDS", "10")),
+)
+
+# The revoked token check only depends on the primary with the "primary" read preference
+blocklist_breaker = (
+    primary_breaker if BLOCKLIST_READ_PREFERENCE == "primary" else database_breaker
+)
+
+# Click increments aggregated in memory and flushed to the primary in the background
+click_counter = ClickCounter(
+    click_stats_collection,
+    primary_breaker,
+    deadline=float(os.getenv("CLICK_FLUSH_DEADLINE_SECONDS", "5")),
+    flush_interval=float(os.getenv("CLICK_FLUSH_INTERVAL", "1")),
+)
+
+# Accept tokens without checking the revoked token list while MongoDB is unavailable
+BLOCKLIST_FAIL_OPEN = os.getenv("BLOCKLIST_FAIL_OPEN", "true").lower() == "true"
+
+# Local read-only snapshot of short URL to long URL mappings, used while MongoDB is unavailable
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+
+# Seconds between snapshot refreshes
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "300"))
+
+# Whether this process rewrites the snapshot. Each refresh scans the whole collection,
+# so it is off by default: enable it in one process per host (or a separate job).
+SNAPSHOT_REFRESH_ENABLED = (
+    os.getenv("SNAPSHOT_REFRESH_ENABLED", "false").lower() == "true"
+)
+
+# Snapshot consulted by decode while the breaker is open, or None when disabled
+local_snapshot = LocalSnapshot(SNAPSHOT_PATH) if SNAPSHOT_PATH else None
+
+
+def load_snapshot_mappings():
+    """
+    Stream all URL mappings sorted by short URL, for writing the local snapshot.
+
+    The sort is served by the unique short_url index, so mappings are streamed
+    in order without being sorted in memory, and the decode read preference
+    keeps the full scan off the primary when secondaries are available.
+    """
+    cursor = url_read_collection.find(
+        {}, {"_id": 0, "short_url": 1, "long_url": 1}
+    ).sort("short_url", 1)
+    return ((mapping["short_url"], mapping["long_url"]) for mapping in cursor)
+
+
+# Refresher rewriting the snapshot, or None when this process does not refresh it
+snapshot_refresher = None
+
+if SNAPSHOT_PATH and SNAPSHOT_REFRESH_ENABLED:
+    snapshot_refresher = SnapshotRefresher(
+        SNAPSHOT_PATH, load_snapshot_mappings, interval=SNAPSHOT_REFRESH_INTERVAL
+    )
+
+# Characters and initial length of generated short codes
+SHORT_CODE_ALPHABET = os.getenv(
+    "SHORT_CODE_ALPHABET", string.ascii_letters + string.digits
+)
+SHORT_CODE_LENGTH = int(os.getenv("SHORT_CODE_LENGTH", "8"))
+
+# Keyspace utilization above which generated short codes get one character longer
+SHORT_CODE_GROWTH_THRESHOLD = float(os.getenv("SHORT_CODE_GROWTH_THRESHOLD", "0.5"))
+
+# Usage of the short code keyspace and the current short code length
+keyspace = Keyspace(
+    settings_collection,
+    url_collection,
+    SHORT_CODE_ALPHABET,
+    min_length=SHORT_CODE_LENGTH,
+    growth_threshold=SHORT_CODE_GROWTH_THRESHOLD,
+    refresh_interval=float(os.getenv("KEYSPACE_REFRESH_SECONDS", "60")),
+)
+
+# Enable write-behind mode for new URL mappings (buffered and flushed in batches)
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+
+# Base path of the write-ahead logs used to recover buffered mappings after a crash
+# (each process appends to its own `<path>.<pid>` file)
+WRITE_BEHIND_LOG_PATH = os.getenv("WRITE_BEHIND_LOG_PATH", "write_behind.log")
+
+# Queue buffering new URL mappings, or None when mappings are inserted synchronously
+write_behind_queue = None
+
+if WRITE_BEHIND_ENABLED:
+    write_behind_queue = WriteBehindQueue(
+        url_collection,
+        WRITE_BEHIND_LOG_PATH,
+        batch_size=int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500")),
+        flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5")),
+    )
+
+
+class DuplicateShortUrls(Exception):
+    """
+    Raised when the unique short_url index cannot be built because several
+    stored URL mappings share a short URL, as older versions could create.
+
+    Args:
+    - count (int): The number of short URLs shared by several mappings, or
+      None if they were not counted.
+    """
+
+    def __init__(self, count=None):
+        shared = "Some" if count is None else str(count)
+        super().__init__(
+            f"{shared} short URLs are shared by several URL mappings, so the "
+            "unique short_url index cannot be created. Run `flask init-db "
+            "--dedupe` to move the duplicates to the url_duplicates collection."
+        )
+        self.count = count
+
+
+def find_duplicate_short_urls():
+    """
+    Find the short URLs shared by several stored URL mappings.
+
+    Returns:
+    - list: For each such short URL, a document with the short URL as `_id`
+      and the `_id`s of its mappings as `ids`.
+    """
+    return list(
+        url_collection.aggregate(
+            [
+                {"$group": {"_id": "$short_url", "ids": {"$push": "$_id"}}},
+                {"$match": {"ids.1": {"$exists": True}}},
+            ],
+            allowDiskUse=True,
+        )
+    )
+
+
+def dedupe_short_urls():
+    """
+    Keep one URL mapping per short URL, moving the others to url_duplicates.
+
+    The oldest mapping of each short URL is kept: it is the one decode has been
+    answering with, so the newer duplicates were never reachable. The moved
+    mappings are kept for reference rather than deleted. It is safe to run
+    repeatedly, including after an interrupted run.
+
+    Returns:
+    - int: The number of URL mappings moved.
+    """
+    moved = 0
+
+    for duplicate in find_duplicate_short_urls():
+        # ObjectIds sort by creation time, so the first one is the oldest mapping
+        shadowed_ids = sorted(duplicate["ids"])[1:]
+
+        for mapping in url_collection.find({"_id": {"$in": shadowed_ids}}):
+            # Copy before deleting, so an interrupted run loses nothing
+            duplicate_url_collection.replace_one(
+                {"_id": mapping["_id"]}, mapping, upsert=True
+            )
+        result = url_collection.delete_many({"_id": {"$in": shadowed_ids}})
+        moved += result.deleted_count
+
+    return moved
+
+
+def ensure_indexes():
+    """
+    Create the indexes the application relies on.
+
+    Index creation is a round trip per index, so it is an explicit startup
+    phase rather than a side effect of importing this module. It is safe to
+    run repeatedly; existing indexes are left untouched.
+
+    Raises:
+    - DuplicateShortUrls: If stored mappings share short URLs, so the unique
+      short_url index cannot be created. The other indexes are still created.
+      The duplicates are not counted, since that scans the whole collection.
+    """
+    duplicate_short_urls = None
+
+    # Create unique index on 'short_url' so every short URL maps to exactly one long URL
+    try:
+        url_collection.create_index("short_url", unique=True)
+    except DuplicateKeyError:
+        # Data from older versions may share short URLs; report it once the rest is done
+        duplicate_short_urls = DuplicateShortUrls()
+
+    # Create compound index on 'long_url' and 'owner' so encode finds the caller's
+    # existing mapping without a collection scan, well within the read deadline
+    # of the shared circuit breaker
+    url_collection.create_index([("long_url", 1), ("owner", 1)])
+
+    # Create compound index on 'owner' and '_id' to list a user's links newest first
+    url_collection.create_index([("owner", 1), ("_id", -1)])
+
+    # Create unique index identifying each click rollup bucket, also serving range queries
+    click_stats_collection.create_index(
+        [("short_url", 1), ("granularity", 1), ("bucket", 1)], unique=True
+    )
+
+    # Create index on 'expires_at' field in click stats collection to expire old buckets
+    click_stats_collection.create_index("expires_at", expireAfterSeconds=0)
+
+    # Create index on 'created_at' field in revoked token collection for automatic expiration
+    revoked_token_collection.create_index(
+        "created_at", expireAfterSeconds=expiry_seconds
+    )
+
+    if duplicate_short_urls:
+        raise duplicate_short_urls
+
+
+def start_background_tasks():
+    """
+    Start the per-process background work of the data layer.
+
+    This starts flushing aggregated click counts and refreshing the short code
+    keyspace. When write-behind mode is enabled, this replays the write-ahead
+    log left by a previous run and starts the flusher thread. When a snapshot
+    path is set, this starts refreshing the local snapshot.
+    """
+    # Flush aggregated click counts periodically, and once more on a clean exit
+    click_counter.start()
+    atexit.register(click_counter.stop)
+
+    # Refresh the short code length and publish encode statistics in the background
+    keyspace.start()
+    atexit.register(keyspace.stop)
+
+    if snapshot_refresher:
+        snapshot_refresher.start()
+
+    if write_behind_queue:
+        # Replay mappings left in the log by a previous run and start flushing
+        write_behind_queue.start()
+        # Drain buffered mappings into MongoDB when the process exits cleanly
+        atexit.register(write_behind_queue.stop)
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+import threading
+import time
+
+# Read preference classes keyed by the mode names used in MongoDB connection strings
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def read_preference(mode, max_staleness=-1):
+    """
+    Build a pymongo read preference from its mode name.
+
+    Args:
+    - mode (str): The read preference mode, e.g. "primary" or "secondaryPreferred".
+    - max_staleness (int): Maximum replication lag in seconds tolerated for a
+      secondary to be eligible for reads, or -1 for no limit. MongoDB requires
+      at least 90 seconds. Ignored for the "primary" mode.
+
+    Returns:
+    - ServerMode: The read preference to pass to `Collection.with_options`.
+
+    Raises:
+    - ValueError: If the mode name is not a known read preference mode.
+    """
+    if mode == "primary":
+        return Primary()
+
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference mode: {mode}")
+
+    return READ_PREFERENCES[mode](max_staleness=max_staleness)
+
+
+class RecentCodes:
+    """
+    Remember short URLs created by this process for a limited time.
+
+    Secondaries can lag behind the primary by up to the configured max
+    staleness, so a short URL created moments ago may not be found on a
+    secondary yet. Decode uses this set to decide when a miss is worth
+    retrying against the primary.
+
+    Args:
+    - window (float): Seconds a short URL is remembered after creation.
+    - max_size (int): Maximum number of short URLs remembered at once; the
+      oldest ones are forgotten first.
+    """
+
+    def __init__(self, window, max_size=100000):
+        self.window = window
+        self.max_size = max_size
+        # Short URLs mapped to their expiry time, oldest first
+        self._codes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, short_url):
+        """
+        Remember a newly created short URL.
+        """
+        with self._lock:
+            self._codes[short_url] = time.monotonic() + self.window
+            self._codes.move_to_end(short_url)
+            self._prune()
+
+    def __contains__(self, short_url):
+        with self._lock:
+            expires_at = self._codes.get(short_url)
+            return expires_at is not None and expires_at > time.monotonic()
+
+    def _prune(self):
+        """
+        Drop expired short URLs and enforce the size limit.
+        """
+        now = time.monotonic()
+        while self._codes:
+            short_url, expires_at = next(iter(self._codes.items()))
+            if expires_at > now and len(self._codes) <= self.max_size:
+                break
+            del self._codes[short_url]
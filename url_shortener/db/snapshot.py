@@ -0,0 +1,250 @@
+from array import array
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+# File signature and layout version of the snapshot format
+MAGIC = b"URLSNAP1"
+
+# Header: signature, number of mappings, offset of the record offset table
+HEADER = struct.Struct("<8sQQ")
+
+# Record: length of the short URL, length of the long URL, followed by both strings
+RECORD = struct.Struct("<HI")
+
+# Entry of the offset table pointing at a record
+OFFSET = struct.Struct("<Q")
+
+
+def write_snapshot(path, mappings):
+    """
+    Write URL mappings to a snapshot file that can be searched through mmap.
+
+    The mappings must be sorted by short URL. The file contains a header, the
+    records, and a table of record offsets that lookups binary-search, so no
+    part of the file needs to be loaded in memory to read it. The file is
+    written to a uniquely named file next to its destination and renamed into
+    place, so readers never see a partial snapshot, even if several processes
+    write it at the same time.
+
+    Args:
+    - path (str): Destination path of the snapshot.
+    - mappings (iterable): Pairs of short URL and long URL, sorted by short URL.
+
+    Returns:
+    - int: The number of mappings written.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    offsets = array("Q")
+
+    try:
+        with os.fdopen(fd, "wb") as snapshot:
+            # Reserve room for the header, written once the table offset is known
+            snapshot.write(b"\0" * HEADER.size)
+
+            for short_url, long_url in mappings:
+                short_bytes = short_url.encode()
+                long_bytes = long_url.encode()
+                offsets.append(snapshot.tell())
+                snapshot.write(RECORD.pack(len(short_bytes), len(long_bytes)))
+                snapshot.write(short_bytes)
+                snapshot.write(long_bytes)
+
+            table_offset = snapshot.tell()
+            if sys.byteorder == "big":
+                # The table is stored little-endian like the rest of the file
+                offsets.byteswap()
+            snapshot.write(offsets.tobytes())
+
+            snapshot.seek(0)
+            snapshot.write(HEADER.pack(MAGIC, len(offsets), table_offset))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+
+        # mkstemp creates the file readable by its owner only
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return len(offsets)
+
+
+class LocalSnapshot:
+    """
+    Read-only, memory-mapped copy of the short URL to long URL mappings.
+
+    Lookups binary-search the mapped file directly, so the snapshot costs no
+    heap memory and is shared between worker processes through the page cache.
+    The file is reopened when it is replaced by a newer snapshot.
+
+    Args:
+    - path (str): Path of the snapshot file.
+    - check_interval (float): Minimum seconds between checks for a newer file.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._mmap = None
+        self._count = 0
+        self._table_offset = 0
+        self._file_id = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, short_url):
+        """
+        Return the long URL of a short URL, or None if it is not in the snapshot.
+
+        A snapshot that cannot be read, such as a corrupt file, is treated as
+        not containing the short URL.
+        """
+        with self._lock:
+            try:
+                return self._search(short_url.encode())
+            except (OSError, ValueError, IndexError, struct.error):
+                # UnicodeDecodeError is a ValueError
+                return None
+
+    def _search(self, key):
+        """
+        Binary-search the snapshot for a short URL and return its long URL.
+        """
+        self._reload_if_changed()
+        if self._mmap is None:
+            return None
+
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            record_short_url, long_url = self._record(middle)
+            if record_short_url < key:
+                low = middle + 1
+            elif record_short_url > key:
+                high = middle
+            else:
+                return long_url.decode()
+        return None
+
+    def _record(self, index):
+        """
+        Return the short URL and long URL bytes of the record at an index.
+        """
+        (offset,) = OFFSET.unpack_from(
+            self._mmap, self._table_offset + index * OFFSET.size
+        )
+        short_length, long_length = RECORD.unpack_from(self._mmap, offset)
+        start = offset + RECORD.size
+        return (
+            self._mmap[start : start + short_length],
+            self._mmap[start + short_length : start + short_length + long_length],
+        )
+
+    def _reload_if_changed(self):
+        """
+        Map the snapshot file again if it was replaced since it was last mapped.
+        """
+        now = time.monotonic()
+        if self._mmap is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return
+
+        with open(self.path, "rb") as snapshot:
+            mapped = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Ignore files that are not complete snapshots
+        valid = len(mapped) >= HEADER.size
+        if valid:
+            magic, count, table_offset = HEADER.unpack_from(mapped, 0)
+            valid = magic == MAGIC and table_offset + count * OFFSET.size == len(mapped)
+        if not valid:
+            mapped.close()
+            return
+
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mapped
+        self._count = count
+        self._table_offset = table_offset
+        self._file_id = file_id
+
+
+class SnapshotRefresher:
+    """
+    Periodically rewrite the local snapshot from the URL mappings collection.
+
+    Args:
+    - path (str): Path of the snapshot file.
+    - load_mappings (function): Called to stream the current mappings as pairs
+      of short URL and long URL, sorted by short URL.
+    - interval (float): Seconds between refreshes.
+    """
+
+    def __init__(self, path, load_mappings, interval=300.0):
+        self.path = path
+        self.load_mappings = load_mappings
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start refreshing the snapshot in a background thread.
+        """
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run, name="snapshot-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background refresh thread.
+        """
+        if self._thread is None:
+            return
+
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def refresh(self):
+        """
+        Rewrite the snapshot with the current mappings.
+
+        Returns:
+        - int: The number of mappings written.
+        """
+        return write_snapshot(self.path, self.load_mappings())
+
+    def _run(self):
+        """
+        Refresh the snapshot every interval until the refresher is stopped.
+        """
+        while not self._stopping.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the previous snapshot; the next pass retries
+                pass
+            self._stopping.wait(self.interval)
@@ -0,0 +1,37 @@
+from .breaker import DatabaseUnavailable, guarded
+from .models import (
+    BLOCKLIST_FAIL_OPEN,
+    READ_DEADLINE,
+    blocklist_breaker,
+    revoked_token_read_collection,
+)
+
+
+def is_token_revoked(jti):
+    """
+    Check whether a JWT token ID is in the database of revoked tokens.
+
+    The check runs on every authenticated request, so it has the same deadline
+    as decode lookups. It goes through the primary's circuit breaker when it
+    reads from the primary, so an election does not open the breaker of decode
+    lookups that secondaries can still serve. While MongoDB is unavailable, the
+    token is treated as valid if `BLOCKLIST_FAIL_OPEN` is enabled (so redirects
+    keep working during database incidents), and as revoked otherwise.
+
+    Args:
+    - jti (str): The JWT token ID.
+
+    Returns:
+    - bool: True if the token has been revoked.
+    """
+    try:
+        revoked_token = guarded(
+            blocklist_breaker,
+            READ_DEADLINE,
+            revoked_token_read_collection.find_one,
+            {"token": jti},
+        )
+    except DatabaseUnavailable:
+        return not BLOCKLIST_FAIL_OPEN
+
+    return revoked_token is not None
@@ -0,0 +1,483 @@
+import glob
+import logging
+import os
+import re
+import threading
+import time
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+# Mongo error code raised when a unique index rejects a duplicate document
+DUPLICATE_KEY_ERROR = 11000
+
+# Seconds a starting process waits for its log to be released by a process adopting it
+LOCK_TIMEOUT = 10.0
+
+# Seconds between attempts to take a log lock
+LOCK_POLL_INTERVAL = 0.05
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class WriteBehindQueue:
+    """
+    Buffer newly created URL mappings in memory and flush them to MongoDB in batches.
+
+    Every mapping handed to the queue is first appended to a local write-ahead log
+    (one extended JSON document per line) and fsync'd, so it survives a crash of
+    the process. The mapping is then served from memory until a background thread flushes it to
+    the collection with a single `insert_many` call per batch. On startup the log
+    is replayed, so anything that was logged but never flushed is flushed again.
+
+    Each process writes its own log, `<log_path>.<pid>`, and holds an exclusive
+    lock on `<log_path>.<pid>.lock` while it runs. On startup, the logs of
+    processes that are gone (whose lock can be taken) are adopted as well, so
+    no worker ever rewrites or truncates a log another live worker appends to.
+
+    A buffered short URL can be claimed by another process before it is
+    flushed. Such a conflicting mapping is never dropped: it stays pending and
+    logged, is reported by `conflicts()`, and is no longer retried. Likewise, a
+    mapping the collection rejects with any other write error is logged,
+    reported by `rejected()` and set aside, so it cannot hold back the others.
+
+    Args:
+    - collection (Collection): The collection the mappings are flushed into.
+    - log_path (str): Base path of the write-ahead log files.
+    - batch_size (int): Maximum number of mappings sent in one `insert_many` call.
+    - flush_interval (float): Seconds the flusher waits for a batch to fill up.
+    """
+
+    def __init__(self, collection, log_path, batch_size=500, flush_interval=0.5):
+        self.collection = collection
+        self.base_path = log_path
+        # Path of this process's log, chosen on start since workers may fork after import
+        self.log_path = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Pending mappings keyed by short URL, and a reverse index by long URL and owner
+        self._pending = {}
+        self._pending_by_long_url = {}
+        # Short URLs of pending mappings whose short URL is stored for another long URL
+        self._conflicts = set()
+        # Short URLs of pending mappings the collection refused with another write error
+        self._rejected = set()
+
+        # Guards the pending dictionaries and sets; never held during disk I/O,
+        # so lookups do not wait behind appends or compaction
+        self._lock = threading.Lock()
+        # Guards the write-ahead log file; taken before `_lock` when both are needed
+        self._append_lock = threading.Lock()
+        # Wakes the flusher early once a full batch is waiting
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._log = None
+        self._log_lock = None
+
+    def start(self):
+        """
+        Replay the write-ahead log and start the background flusher thread.
+        """
+        if self._thread is not None:
+            return
+
+        self.log_path = f"{self.base_path}.{os.getpid()}"
+        self._log_lock = lock_log(self.log_path, timeout=LOCK_TIMEOUT)
+        if self._log_lock is None:
+            self.log_path = None
+            raise RuntimeError(f"Write-ahead log {self.base_path} is already in use")
+
+        # Reload any mappings that were logged but not flushed before a crash
+        adopted = self.replay()
+
+        # Open the log for appending new mappings, and rewrite it without any torn line
+        self._log = open(self.log_path, "a", encoding="utf-8")
+        self._compact_log()
+
+        # The adopted mappings are now in this process's log
+        for path, lock in adopted:
+            remove_log(path, lock)
+
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the flusher thread after draining all pending mappings.
+        """
+        if self._thread is None:
+            return
+
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+        # Flush whatever arrived after the flusher's last pass
+        self.flush()
+        self._log.close()
+        self._log = None
+
+        if self._pending:
+            # Keep the log for the next process to adopt
+            self._log_lock.close()
+        else:
+            remove_log(self.log_path, self._log_lock)
+        self._log_lock = None
+
+    def enqueue(self, document):
+        """
+        Durably log a new mapping and make it visible to lookups immediately.
+
+        Args:
+        - document (dict): The mapping document, containing at least the
+          `short_url` and `long_url` fields.
+        """
+        line = json_util.dumps(document)
+
+        with self._append_lock:
+            # Append to the write-ahead log before acknowledging the mapping
+            self._log.write(line + "\n")
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+            # Still under the append lock, so a compaction cannot drop the new line
+            with self._lock:
+                self._pending[document["short_url"]] = document
+                self._pending_by_long_url[long_url_key(document)] = document
+                pending_count = len(self._pending)
+
+        # Flush early instead of waiting for the interval when a batch is full
+        if pending_count >= self.batch_size:
+            self._wakeup.set()
+
+    def find_by_short_url(self, short_url):
+        """
+        Return the pending mapping for a short URL, or None if it is not pending.
+        """
+        with self._lock:
+            return self._pending.get(short_url)
+
+    def find_by_long_url(self, long_url, owner):
+        """
+        Return the pending mapping of a user for a long URL, or None if it is not pending.
+        """
+        with self._lock:
+            return self._pending_by_long_url.get((long_url, owner))
+
+    def update_pending(self, short_url, fields):
+        """
+        Update the fields of a pending mapping before it is flushed.
+
+        Args:
+        - short_url (str): The short URL of the mapping.
+        - fields (dict): The fields to set on the mapping.
+
+        Returns:
+        - bool: True if the mapping was pending and has been updated.
+        """
+        with self._lock:
+            mapping = self._pending.get(short_url)
+            if mapping is None:
+                return False
+
+            # Replace rather than mutate: the flusher may be encoding the old copy
+            updated = {**mapping, **fields}
+            self._pending[short_url] = updated
+            key = long_url_key(mapping)
+            if self._pending_by_long_url.get(key) is mapping:
+                self._pending_by_long_url[key] = updated
+            return True
+
+    def conflicts(self):
+        """
+        Return the pending mappings whose short URL was taken by another long URL.
+        """
+        with self._lock:
+            return [self._pending[short_url] for short_url in self._conflicts]
+
+    def rejected(self):
+        """
+        Return the pending mappings the collection refused with a write error.
+        """
+        with self._lock:
+            return [self._pending[short_url] for short_url in self._rejected]
+
+    def pending_mappings(self):
+        """
+        Return a snapshot of all mappings that are not flushed yet.
+        """
+        with self._lock:
+            return list(self._pending.values())
+
+    def flush(self):
+        """
+        Insert all pending mappings into the collection in batches.
+
+        Mappings are only dropped from memory once their batch has been written,
+        and the write-ahead log is compacted to the mappings still pending.
+        Conflicting and rejected mappings are kept pending and skipped.
+        """
+        with self._lock:
+            batch = [
+                document
+                for short_url, document in self._pending.items()
+                if short_url not in self._conflicts and short_url not in self._rejected
+            ]
+
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start : start + self.batch_size]
+            conflicts, rejected = self._insert(chunk)
+
+            with self._lock:
+                for document in chunk:
+                    if document["short_url"] in conflicts:
+                        self._conflicts.add(document["short_url"])
+                        continue
+                    if document["short_url"] in rejected:
+                        self._rejected.add(document["short_url"])
+                        continue
+                    # Only forget the mapping if it was not replaced meanwhile
+                    if self._pending.get(document["short_url"]) is document:
+                        del self._pending[document["short_url"]]
+                    key = long_url_key(document)
+                    if self._pending_by_long_url.get(key) is document:
+                        del self._pending_by_long_url[key]
+
+        if batch:
+            self._compact_log()
+
+    def replay(self):
+        """
+        Load every mapping recorded in the write-ahead logs back into memory.
+
+        This process's own log is read (it exists when an earlier process had
+        the same pid), as well as the logs of processes that are gone. A log is
+        only read once its lock is held, so logs of live processes are skipped.
+        The mappings become pending again, so they are served from memory and
+        re-inserted by the next flush like any other buffered mapping.
+
+        Returns:
+        - list: The (path, lock file) pairs of the adopted logs of other
+          processes, to be removed once their mappings are in this process's log.
+        """
+        self._load_log(self.log_path)
+
+        # Without file locks there is no telling whether another log is in use
+        if fcntl is None:
+            return []
+
+        adopted = []
+        for path in other_logs(self.base_path, self.log_path):
+            lock = lock_log(path)
+            if lock is None:
+                continue
+            self._load_log(path)
+            adopted.append((path, lock))
+        return adopted
+
+    def _load_log(self, path):
+        """
+        Add the mappings recorded in one write-ahead log to the pending mappings.
+        """
+        if not os.path.exists(path):
+            return
+
+        with open(path, encoding="utf-8") as log:
+            for line in log:
+                line = line.strip()
+                # A torn final line means the process died mid-write; it was never acknowledged
+                try:
+                    document = json_util.loads(line)
+                except ValueError:
+                    continue
+
+                with self._lock:
+                    self._pending[document["short_url"]] = document
+                    self._pending_by_long_url[long_url_key(document)] = document
+
+    def _insert(self, documents):
+        """
+        Insert a batch of mappings, ignoring ones that are already stored.
+
+        Replaying the log after a crash can re-send mappings that were flushed
+        but not yet compacted out of the log, so duplicate key errors are
+        expected. A duplicate is only ignored when the stored mapping is the
+        same one (same `_id`, brought up to date with the pending copy) or
+        points to the same long URL; otherwise its
+        short URL was claimed by another process, and the mapping is reported
+        as a conflict. A mapping failing with any other write error is
+        reported as rejected; the rest of the batch was still inserted.
+
+        Args:
+        - documents (list): The mapping documents to insert.
+
+        Returns:
+        - tuple: The short URLs of the mappings that conflict with stored ones,
+          and the short URLs of the mappings that were rejected.
+
+        Raises:
+        - PyMongoError: If the batch could not be sent at all.
+        """
+        if not documents:
+            return set(), set()
+
+        try:
+            self.collection.insert_many(documents, ordered=False)
+            return set(), set()
+        except BulkWriteError as bwe:
+            errors = bwe.details.get("writeErrors", [])
+
+        conflicts = set()
+        rejected = set()
+        for error in errors:
+            document = documents[error["index"]]
+            if error.get("code") != DUPLICATE_KEY_ERROR:
+                logger.error(
+                    "Could not store buffered mapping %s: %s",
+                    document["short_url"],
+                    error.get("errmsg"),
+                )
+                rejected.add(document["short_url"])
+                continue
+
+            stored = self.collection.find_one({"short_url": document["short_url"]})
+
+            if stored is None:
+                continue
+
+            if stored["_id"] == document["_id"]:
+                # Already flushed, by this process or by a replay of its log;
+                # store any fields updated since that copy was written
+                if stored != document:
+                    self.collection.replace_one({"_id": document["_id"]}, document)
+                continue
+
+            if stored["long_url"] != document["long_url"]:
+                logger.error(
+                    "Short URL %s is stored for %s; keeping buffered mapping to %s",
+                    document["short_url"],
+                    stored["long_url"],
+                    document["long_url"],
+                )
+                conflicts.add(document["short_url"])
+
+        return conflicts, rejected
+
+    def _compact_log(self):
+        """
+        Rewrite the write-ahead log so it only contains mappings still pending.
+
+        Appends wait for the rewrite, but lookups do not: the pending mappings
+        are copied under the lock and written out after releasing it.
+        """
+        with self._append_lock:
+            with self._lock:
+                documents = list(self._pending.values())
+
+            temp_path = self.log_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as temp:
+                for document in documents:
+                    temp.write(json_util.dumps(document) + "\n")
+                temp.flush()
+                os.fsync(temp.fileno())
+
+            # Atomically swap the compacted log in and reopen it for appending
+            self._log.close()
+            os.replace(temp_path, self.log_path)
+            self._log = open(self.log_path, "a", encoding="utf-8")
+
+    def _run(self):
+        """
+        Flush pending mappings every interval until the queue is stopped.
+        """
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+            try:
+                self.flush()
+            except Exception:
+                # Keep the mappings pending and logged; the next pass retries them
+                logger.exception("Could not flush buffered mappings")
+                continue
+
+
+def long_url_key(document):
+    """
+    Return the key of a mapping in the reverse index by long URL and owner.
+    """
+    return document["long_url"], document.get("owner")
+
+
+def other_logs(base_path, own_path):
+    """
+    Return the write-ahead logs under a base path, other than this process's.
+
+    This includes the log at the base path itself, written by versions that
+    shared a single log between processes.
+    """
+    pattern = re.compile(re.escape(base_path) + r"(\.\d+)?")
+    return sorted(
+        path
+        for path in glob.glob(glob.escape(base_path) + "*")
+        if pattern.fullmatch(path) and path != own_path
+    )
+
+
+def lock_log(path, timeout=0.0):
+    """
+    Take the exclusive lock guarding a write-ahead log.
+
+    The lock lives in a separate `<path>.lock` file, because compaction replaces
+    the log file itself. A lock file removed by the process that held it no
+    longer guards anything, so it is reopened.
+
+    Args:
+    - path (str): Path of the write-ahead log.
+    - timeout (float): Seconds to wait for another process to release the lock.
+
+    Returns:
+    - file: The open lock file holding the lock (closing it releases the lock),
+      or None if the lock is still held by another process after `timeout`.
+    """
+    lock_path = path + ".lock"
+    deadline = time.monotonic() + timeout
+
+    while True:
+        lock = open(lock_path, "a")
+        if fcntl is None:
+            return lock
+
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # Make sure the lock file was not removed while it was being opened
+            if os.stat(lock_path).st_ino == os.fstat(lock.fileno()).st_ino:
+                return lock
+        except (BlockingIOError, FileNotFoundError):
+            pass
+
+        lock.close()
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(LOCK_POLL_INTERVAL)
+
+
+def remove_log(path, lock):
+    """
+    Delete a write-ahead log and its lock file, then release the lock.
+    """
+    for stale_path in (path, path + ".lock"):
+        try:
+            os.remove(stale_path)
+        except FileNotFoundError:
+            pass
+    lock.close()
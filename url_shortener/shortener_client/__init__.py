@@ -0,0 +1,3 @@
+from shortener_client.errors import AuthenticationError, ClientError
+from shortener_client.sync import ShortenerClient
+from shortener_client.aio import AsyncShortenerClient
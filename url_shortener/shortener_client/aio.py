@@ -0,0 +1,219 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from shortener_client.errors import ClientError
+from shortener_client.sync import DEFAULT_BASE_URL, MAX_BULK_ITEMS, ShortenerClient
+
+
+class Batcher:
+    """
+    Group concurrent calls into bulk requests.
+
+    Calls made while a batch is open are collected for `window` seconds (or
+    until `max_size` calls are waiting) and sent together with `send_batch`.
+    Each caller then receives its own item's result.
+
+    Args:
+    - send_batch (coroutine function): Sends a list of items and returns one
+      result per item, in order. A result that is a ClientError is raised to
+      the caller of that item.
+    - window (float): Seconds a batch stays open for more calls.
+    - max_size (int): Maximum number of items in one batch.
+    """
+
+    def __init__(self, send_batch, window=0.005, max_size=MAX_BULK_ITEMS):
+        self.send_batch = send_batch
+        self.window = window
+        self.max_size = max_size
+        self._items = []
+        self._futures = []
+        self._timer = None
+        # Batches being sent; the event loop only keeps weak references to tasks
+        self._tasks = set()
+
+    async def submit(self, item):
+        """
+        Add an item to the open batch and wait for its result.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append(item)
+        self._futures.append(future)
+
+        if len(self._items) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """
+        Close the open batch and send it in the background.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        if items:
+            task = asyncio.ensure_future(self._send(items, futures))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, items, futures):
+        """
+        Send a batch and hand each caller its result.
+        """
+        try:
+            results = await self.send_batch(items)
+        except Exception as error:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, ClientError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        # A response with fewer results than items must not leave callers waiting
+        for future in futures[len(results) :]:
+            if not future.done():
+                future.set_exception(ClientError("No result returned for this item"))
+
+
+class AsyncShortenerClient:
+    """
+    Asyncio client for the URL Shortener API.
+
+    Requests are sent by a synchronous ShortenerClient in a pool of worker
+    threads, so connections are reused and tokens are refreshed on 401 exactly
+    as in the synchronous client. Concurrent `shorten` and `expand` calls are
+    grouped transparently into bulk requests: callers awaiting them at the same
+    time share one round trip.
+
+    Args:
+    - base_url (str): URL of the Flask server.
+    - username (str): Username used to obtain and refresh tokens (optional).
+    - password (str): Password used to obtain and refresh tokens (optional).
+    - token (str): An existing JWT access token (optional).
+    - timeout (float): Seconds to wait for the server on each request.
+    - max_workers (int): Maximum number of requests in flight.
+    - batch_window (float): Seconds concurrent calls are collected into a batch.
+    """
+
+    def __init__(
+        self,
+        base_url=DEFAULT_BASE_URL,
+        username=None,
+        password=None,
+        token=None,
+        timeout=10.0,
+        max_workers=8,
+        batch_window=0.005,
+    ):
+        self.client = ShortenerClient(base_url, username, password, token, timeout)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="shortener-client"
+        )
+        self._shorten_batcher = Batcher(self._shorten_batch, window=batch_window)
+        self._expand_batcher = Batcher(self._expand_batch, window=batch_window)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the client's connections and worker threads.
+        """
+        await self._run(self.client.close)
+        self._executor.shutdown(wait=False)
+
+    @property
+    def token(self):
+        """
+        The current JWT access token.
+        """
+        return self.client.token
+
+    async def signup(self, username, password):
+        """
+        Register a new user and use its access token for later requests.
+
+        Returns:
+        - str: The JWT access token.
+        """
+        return await self._run(self.client.signup, username, password)
+
+    async def login(self, username=None, password=None):
+        """
+        Log in and use the new access token for later requests.
+
+        Returns:
+        - str: The JWT access token.
+        """
+        return await self._run(self.client.login, username, password)
+
+    async def logout(self):
+        """
+        Revoke the current access token and forget the credentials.
+        """
+        await self._run(self.client.logout)
+
+    async def shorten(self, long_url, alias=None):
+        """
+        Encode a long URL into a short URL, batched with concurrent calls.
+
+        Returns:
+        - str: The short URL.
+
+        Raises:
+        - ClientError: If the long URL is invalid or the alias is unavailable.
+        """
+        item = long_url if alias is None else (long_url, alias)
+        return await self._shorten_batcher.submit(item)
+
+    async def expand(self, short_url):
+        """
+        Decode a short URL into its long URL, batched with concurrent calls.
+
+        Returns:
+        - str: The long URL.
+
+        Raises:
+        - ClientError: If the short URL is not found.
+        """
+        return await self._expand_batcher.submit(short_url)
+
+    async def shorten_many(self, long_urls):
+        """
+        Encode several long URLs; see `ShortenerClient.shorten_many`.
+        """
+        return await self._run(self.client.shorten_many, list(long_urls))
+
+    async def expand_many(self, short_urls):
+        """
+        Decode several short URLs; see `ShortenerClient.expand_many`.
+        """
+        return await self._run(self.client.expand_many, list(short_urls))
+
+    async def _shorten_batch(self, items):
+        return await self._run(self.client.shorten_many, items)
+
+    async def _expand_batch(self, short_urls):
+        return await self._run(self.client.expand_many, short_urls)
+
+    async def _run(self, function, *args):
+        """
+        Run a blocking client call in the worker threads.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
@@ -0,0 +1,22 @@
+class ClientError(Exception):
+    """
+    Raised when the URL Shortener server rejects a request or cannot be reached.
+
+    Args:
+    - message (str): The error message, taken from the server response when
+      there is one.
+    - status_code (int): The HTTP status code of the response, or None if no
+      response was received.
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class AuthenticationError(ClientError):
+    """
+    Raised when the client cannot authenticate, e.g. because of invalid credentials
+    or because its token expired and no credentials are available to refresh it.
+    """
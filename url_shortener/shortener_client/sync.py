@@ -0,0 +1,307 @@
+import threading
+import requests
+from shortener_client.errors import AuthenticationError, ClientError
+
+# URL of the Flask server used when none is given
+DEFAULT_BASE_URL = "http://localhost:5000"
+
+# Maximum number of items the server accepts in a bulk request
+MAX_BULK_ITEMS = 100
+
+
+class ShortenerClient:
+    """
+    Synchronous client for the URL Shortener API.
+
+    Connections are kept alive and reused through one `requests.Session` per
+    thread. When credentials are known (passed in, or from the last `signup` or
+    `login`), a request rejected with 401 (Unauthorized) logs in again and is
+    retried once with the new token.
+
+    Args:
+    - base_url (str): URL of the Flask server.
+    - username (str): Username used to obtain and refresh tokens (optional).
+    - password (str): Password used to obtain and refresh tokens (optional).
+    - token (str): An existing JWT access token (optional).
+    - timeout (float): Seconds to wait for the server on each request.
+    """
+
+    def __init__(
+        self,
+        base_url=DEFAULT_BASE_URL,
+        username=None,
+        password=None,
+        token=None,
+        timeout=10.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.token = token
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sessions = []
+        # Serializes token refreshes so concurrent 401s log in only once
+        self._token_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close the connections of all sessions opened by this client.
+        """
+        for session in self._sessions:
+            session.close()
+        self._sessions = []
+        self._local = threading.local()
+
+    def signup(self, username, password):
+        """
+        Register a new user and use its access token for later requests.
+
+        Args:
+        - username (str): The username of the new user.
+        - password (str): The password of the new user.
+
+        Returns:
+        - str: The JWT access token.
+
+        Raises:
+        - ClientError: If the signup is rejected, e.g. the username is taken.
+        """
+        data = self._request(
+            "POST",
+            "/auth/signup",
+            json={"username": username, "password": password},
+            authenticated=False,
+        )
+        self.username, self.password = username, password
+        self.token = data["access_token"]
+        return self.token
+
+    def login(self, username=None, password=None):
+        """
+        Log in and use the new access token for later requests.
+
+        Args:
+        - username (str): The username, defaults to the client's username.
+        - password (str): The password, defaults to the client's password.
+
+        Returns:
+        - str: The JWT access token.
+
+        Raises:
+        - AuthenticationError: If no credentials are known or they are invalid.
+        """
+        username = username or self.username
+        password = password or self.password
+        if not username or not password:
+            raise AuthenticationError("No credentials to log in with")
+
+        try:
+            data = self._request(
+                "POST",
+                "/auth/login",
+                json={"username": username, "password": password},
+                authenticated=False,
+            )
+        except ClientError as error:
+            if error.status_code == 401:
+                raise AuthenticationError(error.message, error.status_code)
+            raise
+
+        self.username, self.password = username, password
+        self.token = data["access_token"]
+        return self.token
+
+    def logout(self):
+        """
+        Revoke the current access token and forget the credentials.
+
+        The credentials are cleared so a later 401 does not silently log in
+        again and undo the logout.
+
+        Raises:
+        - ClientError: If the logout is rejected.
+        """
+        self._request("POST", "/auth/logout", refresh=False)
+        self.token = None
+        self.username = self.password = None
+
+    def shorten(self, long_url, alias=None):
+        """
+        Encode a long URL into a short URL.
+
+        Args:
+        - long_url (str): The long URL to be encoded.
+        - alias (str): A custom alias for the short URL (optional).
+
+        Returns:
+        - str: The short URL.
+
+        Raises:
+        - ClientError: If the long URL is invalid or the alias is unavailable.
+        """
+        payload = {"long_url": long_url}
+        if alias is not None:
+            payload["alias"] = alias
+        return self._request("POST", "/api/encode", json=payload)["short_url"]
+
+    def expand(self, short_url):
+        """
+        Decode a short URL into its long URL.
+
+        Args:
+        - short_url (str): The short URL, or just its identifier.
+
+        Returns:
+        - str: The long URL.
+
+        Raises:
+        - ClientError: If the short URL is not found.
+        """
+        return self._request("POST", "/api/decode", json={"short_url": short_url})[
+            "long_url"
+        ]
+
+    def shorten_many(self, long_urls):
+        """
+        Encode several long URLs using bulk requests.
+
+        Args:
+        - long_urls (list): The long URLs, or (long URL, alias) pairs.
+
+        Returns:
+        - list: For each long URL, in order, either the short URL or the
+          ClientError describing why it could not be encoded.
+        """
+        items = []
+        for url in long_urls:
+            if isinstance(url, str):
+                items.append({"long_url": url})
+            else:
+                items.append({"long_url": url[0], "alias": url[1]})
+
+        results = self._bulk("/api/encode/bulk", "items", items)
+        return [
+            result["short_url"] if "short_url" in result else item_error(result)
+            for result in results
+        ]
+
+    def expand_many(self, short_urls):
+        """
+        Decode several short URLs using bulk requests.
+
+        Args:
+        - short_urls (list): The short URLs, or just their identifiers.
+
+        Returns:
+        - list: For each short URL, in order, either the long URL or the
+          ClientError describing why it could not be decoded.
+        """
+        results = self._bulk("/api/decode/bulk", "short_urls", list(short_urls))
+        return [
+            result["long_url"] if "long_url" in result else item_error(result)
+            for result in results
+        ]
+
+    def _bulk(self, path, key, items):
+        """
+        Send items to a bulk route in chunks the server accepts and return all results.
+        """
+        results = []
+        for start in range(0, len(items), MAX_BULK_ITEMS):
+            chunk = items[start : start + MAX_BULK_ITEMS]
+            results.extend(self._request("POST", path, json={key: chunk})["results"])
+        return results
+
+    def _session(self):
+        """
+        Return the session of the current thread, creating it on first use.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+            self._sessions.append(session)
+        return session
+
+    def _request(self, method, path, json=None, authenticated=True, refresh=True):
+        """
+        Send a request to the server and return its decoded JSON body.
+
+        Args:
+        - method (str): The HTTP method.
+        - path (str): The path of the route, starting with '/'.
+        - json (dict): The JSON request body (optional).
+        - authenticated (bool): Whether to send the access token.
+        - refresh (bool): Whether to log in again and retry once on 401.
+
+        Returns:
+        - dict: The JSON response body.
+
+        Raises:
+        - ClientError: If the server cannot be reached or answers with an error.
+        """
+        token = self.token
+        response = self._send(method, path, json, token if authenticated else None)
+
+        if (
+            response.status_code == 401
+            and authenticated
+            and refresh
+            and self.username
+            and self.password
+        ):
+            with self._token_lock:
+                # Another thread may already have refreshed the token
+                if self.token == token:
+                    self.login()
+            response = self._send(method, path, json, self.token)
+
+        if response.status_code >= 400:
+            raise response_error(response)
+        return response.json()
+
+    def _send(self, method, path, json, token):
+        """
+        Send one HTTP request with the current thread's session.
+        """
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        try:
+            return self._session().request(
+                method,
+                f"{self.base_url}{path}",
+                json=json,
+                headers=headers,
+                timeout=self.timeout,
+            )
+        except requests.RequestException as error:
+            raise ClientError(f"Could not reach the server: {error}")
+
+
+def response_error(response):
+    """
+    Build the ClientError describing an error response.
+    """
+    try:
+        body = response.json()
+        # Flask-JWT-Extended reports token problems under "msg"
+        message = body.get("error") or body.get("msg") or response.text
+    except (ValueError, AttributeError):
+        message = response.text
+
+    if response.status_code == 401:
+        return AuthenticationError(message, response.status_code)
+    return ClientError(message, response.status_code)
+
+
+def item_error(result):
+    """
+    Build the ClientError describing a failed item of a bulk response.
+    """
+    return ClientError(result.get("error", "Unknown error"), result.get("status"))
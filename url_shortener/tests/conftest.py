@@ -0,0 +1,71 @@
+import os
+import sys
+import mongomock
+import pytest
+
+# The application imports its packages relative to the url_shortener directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def url_collection():
+    """
+    An in-memory URL mappings collection with the unique short_url index.
+    """
+    collection = mongomock.MongoClient().db.urls
+    collection.create_index("short_url", unique=True)
+    return collection
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """
+    Point the application's collections at a fresh in-memory database.
+    """
+    import db
+
+    mongo_client = mongomock.MongoClient()
+    monkeypatch.setattr(db.models, "get_client", lambda: mongo_client)
+    monkeypatch.setattr(db.models, "get_database", lambda: mongo_client.url_shortener)
+    # Make the lazy collections resolve again, against the in-memory database
+    monkeypatch.setattr(db.models, "client_generation", object())
+    db.ensure_indexes()
+    return mongo_client.url_shortener
+
+
+@pytest.fixture
+def app(database, monkeypatch):
+    """
+    The Flask application, without its background threads or URL probes.
+    """
+    import api.encode
+    import api.validation
+    import app as app_module
+    import db
+
+    monkeypatch.setattr(db, "start_background_tasks", lambda: None)
+    monkeypatch.setattr(api.validation, "validation_pipeline", None)
+    monkeypatch.setattr(api.encode, "validation_pipeline", None)
+    return app_module.create_app(
+        {"JWT_SECRET_KEY": "test-secret-key-of-at-least-32-bytes"}
+    )
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """
+    Return the authorization headers of an access token for a username.
+    """
+    from flask_jwt_extended import create_access_token
+
+    def headers(username="alice"):
+        with app.app_context():
+            token = create_access_token(identity=username)
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
@@ -0,0 +1,83 @@
+import pytest
+import api.admin
+import api.aliases
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(api.admin, "ADMIN_USERNAMES", frozenset({"admin"}))
+
+
+def encode(client, headers, long_url, alias):
+    return client.post(
+        "/api/encode", json={"long_url": long_url, "alias": alias}, headers=headers
+    )
+
+
+def test_free_alias_is_created(client, auth_headers, database):
+    response = encode(client, auth_headers(), "https://example.com/a", "my-link")
+
+    assert response.status_code == 201
+    assert response.get_json() == {"short_url": "https://short.est/my-link"}
+    assert database.urls.find_one({"short_url": "my-link"})["owner"] == "alice"
+
+
+def test_same_alias_and_long_url_by_its_owner_is_returned(client, auth_headers):
+    encode(client, auth_headers(), "https://example.com/a", "my-link")
+
+    response = encode(client, auth_headers(), "https://example.com/a", "my-link")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"short_url": "https://short.est/my-link"}
+
+
+@pytest.mark.parametrize(
+    "username, long_url",
+    [("alice", "https://example.com/b"), ("bob", "https://example.com/a")],
+)
+def test_taken_alias_is_a_conflict(client, auth_headers, username, long_url):
+    encode(client, auth_headers("alice"), "https://example.com/a", "my-link")
+
+    response = encode(client, auth_headers(username), long_url, "my-link")
+
+    assert response.status_code == 409
+
+
+@pytest.mark.parametrize("alias", ["admin", "API", "a", "-dash", "has space"])
+def test_reserved_or_malformed_alias_is_rejected(client, auth_headers, alias):
+    response = encode(client, auth_headers(), "https://example.com/a", alias)
+
+    assert response.status_code == 400
+
+
+def test_prefix_search_lists_taken_short_urls_and_free_aliases(
+    client, auth_headers, database, admin
+):
+    for short_url in ("promo", "promo-2", "promo-x", "prom", "other"):
+        database.urls.insert_one({"short_url": short_url, "long_url": "https://a.b"})
+
+    response = client.get(
+        "/api/aliases?prefix=promo&limit=3", headers=auth_headers("admin")
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "taken": ["promo", "promo-2", "promo-x"],
+        "suggestions": ["promo-3", "promo-4", "promo-5"],
+    }
+
+
+def test_prefix_search_escapes_regular_expressions(
+    client, auth_headers, database, admin
+):
+    database.urls.insert_one({"short_url": "abc", "long_url": "https://a.b"})
+
+    response = client.get("/api/aliases?prefix=a.c", headers=auth_headers("admin"))
+
+    assert response.get_json()["taken"] == []
+
+
+def test_prefix_search_requires_an_admin(client, auth_headers):
+    response = client.get("/api/aliases?prefix=promo", headers=auth_headers())
+
+    assert response.status_code == 403
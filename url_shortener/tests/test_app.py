@@ -0,0 +1,74 @@
+import logging
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+import app as app_module
+import db
+
+
+@pytest.fixture
+def started(monkeypatch):
+    """
+    Record background task starts instead of starting any threads.
+    """
+    calls = []
+    monkeypatch.setattr(db, "start_background_tasks", lambda: calls.append(True))
+    return calls
+
+
+def test_create_app_does_not_contact_the_database(monkeypatch, started):
+    def get_client():
+        raise AssertionError("the database was contacted")
+
+    monkeypatch.setattr(db.models, "get_client", get_client)
+    monkeypatch.delenv("DB_INIT_ON_STARTUP", raising=False)
+
+    app = app_module.create_app()
+
+    assert app.config["DB_INIT_ON_STARTUP"] is False
+    assert "init-db" in app.cli.commands
+    assert started == []
+
+
+def test_unreachable_database_at_startup_is_logged(monkeypatch, started, caplog):
+    def ensure_indexes():
+        raise ServerSelectionTimeoutError("No servers found")
+
+    monkeypatch.setattr(db, "ensure_indexes", ensure_indexes)
+
+    with caplog.at_level(logging.ERROR):
+        app = app_module.create_app({"DB_INIT_ON_STARTUP": True})
+
+    assert app is not None
+    assert "Could not create database indexes" in caplog.text
+
+
+def test_background_tasks_start_once_on_the_first_request(started):
+    app = app_module.create_app()
+    client = app.test_client()
+
+    client.get("/missing")
+    client.get("/missing")
+
+    assert started == [True]
+
+
+def test_duplicate_short_urls_are_only_counted_by_init_db(app, database, monkeypatch):
+    database.urls.drop_indexes()
+    database.urls.insert_many(
+        [{"short_url": "abc", "long_url": f"https://example.com/{n}"} for n in (1, 2)]
+    )
+    scans = []
+    find_duplicates = db.find_duplicate_short_urls
+    monkeypatch.setattr(
+        db, "find_duplicate_short_urls", lambda: scans.append(1) or find_duplicates()
+    )
+
+    with pytest.raises(db.DuplicateShortUrls) as error:
+        db.ensure_indexes()
+    assert error.value.count is None
+    assert scans == []
+
+    result = app.test_cli_runner().invoke(args=["init-db"])
+
+    assert result.exit_code == 1
+    assert "1 short URLs are shared" in result.output
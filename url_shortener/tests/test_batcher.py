@@ -0,0 +1,128 @@
+import asyncio
+import gc
+import pytest
+from shortener_client.aio import Batcher
+from shortener_client.errors import ClientError
+
+
+class FakeBulkRoute:
+    """
+    Records the batches it receives and answers each item with its upper-case form.
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(0)
+        return [
+            ClientError("Short URL not found", 404)
+            if item == "missing"
+            else item.upper()
+            for item in items
+        ]
+
+
+def test_concurrent_calls_share_one_batch():
+    route = FakeBulkRoute()
+
+    async def main():
+        batcher = Batcher(route, window=0.01)
+        return await asyncio.gather(*(batcher.submit(f"u{i}") for i in range(5)))
+
+    assert asyncio.run(main()) == ["U0", "U1", "U2", "U3", "U4"]
+    assert route.batches == [["u0", "u1", "u2", "u3", "u4"]]
+
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    route = FakeBulkRoute()
+
+    async def main():
+        # The window is far longer than the test is allowed to take
+        batcher = Batcher(route, window=60, max_size=2)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(f"u{i}") for i in range(4))), timeout=1
+        )
+
+    assert asyncio.run(main()) == ["U0", "U1", "U2", "U3"]
+    assert route.batches == [["u0", "u1"], ["u2", "u3"]]
+
+
+def test_failed_item_raises_only_for_its_caller():
+    route = FakeBulkRoute()
+
+    async def main():
+        batcher = Batcher(route, window=0.01)
+        return await asyncio.gather(
+            batcher.submit("a"), batcher.submit("missing"), return_exceptions=True
+        )
+
+    found, missing = asyncio.run(main())
+    assert found == "A"
+    assert isinstance(missing, ClientError) and missing.status_code == 404
+
+
+def test_failed_batch_raises_for_every_caller():
+    async def unreachable(items):
+        raise ClientError("Could not reach the server")
+
+    async def main():
+        batcher = Batcher(unreachable, window=0.01)
+        return await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ClientError) for result in results)
+
+
+def test_items_missing_from_the_response_raise_for_their_callers():
+    async def truncated(items):
+        return [item.upper() for item in items[:1]]
+
+    async def main():
+        batcher = Batcher(truncated, window=0.01)
+        return await asyncio.wait_for(
+            asyncio.gather(
+                batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+            ),
+            timeout=1,
+        )
+
+    found, missing = asyncio.run(main())
+    assert found == "A"
+    assert isinstance(missing, ClientError)
+
+
+def test_in_flight_batches_survive_garbage_collection():
+    release = None
+
+    async def slow_route(items):
+        await release.wait()
+        return items
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        batcher = Batcher(slow_route, window=0)
+        waiter = asyncio.ensure_future(batcher.submit("a"))
+        await asyncio.sleep(0.01)
+        gc.collect()
+        release.set()
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    assert asyncio.run(main()) == "a"
+
+
+@pytest.mark.parametrize("size", [1, 3])
+def test_batches_never_exceed_max_size(size):
+    route = FakeBulkRoute()
+
+    async def main():
+        batcher = Batcher(route, window=0.01, max_size=size)
+        await asyncio.gather(*(batcher.submit(f"u{i}") for i in range(7)))
+
+    asyncio.run(main())
+    assert max(len(batch) for batch in route.batches) <= size
+    assert sum(len(batch) for batch in route.batches) == 7
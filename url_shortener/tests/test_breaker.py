@@ -0,0 +1,123 @@
+import pytest
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+from db import breaker as breaker_module
+from db.breaker import CircuitBreaker, DatabaseUnavailable
+
+
+class Clock:
+    """
+    Controllable replacement for time.monotonic.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, "monotonic", clock)
+    return clock
+
+
+def fail():
+    raise AutoReconnect("connection refused")
+
+
+def succeed():
+    return "ok"
+
+
+def trip(breaker, times):
+    for _ in range(times):
+        with pytest.raises(DatabaseUnavailable):
+            breaker.call(fail)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+
+    trip(breaker, 2)
+    assert not breaker.is_open
+
+    trip(breaker, 1)
+    assert breaker.is_open
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+
+    trip(breaker, 2)
+    assert breaker.call(succeed) == "ok"
+    trip(breaker, 2)
+
+    assert not breaker.is_open
+
+
+def test_open_breaker_rejects_calls_without_running_them(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    trip(breaker, 1)
+    calls = []
+
+    with pytest.raises(DatabaseUnavailable, match="open"):
+        breaker.call(calls.append, "called")
+
+    assert calls == []
+
+
+def test_half_open_trial_success_closes_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    trip(breaker, 1)
+
+    clock.now += 10
+    assert breaker.call(succeed) == "ok"
+
+    assert not breaker.is_open
+    assert breaker.call(succeed) == "ok"
+
+
+def test_half_open_trial_failure_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    trip(breaker, 3)
+
+    clock.now += 10
+    trip(breaker, 1)
+
+    # A single failed trial reopens it for a full reset timeout
+    assert breaker.is_open
+    clock.now += 9
+    with pytest.raises(DatabaseUnavailable, match="open"):
+        breaker.call(succeed)
+
+
+def test_only_one_trial_call_runs_while_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    trip(breaker, 1)
+    clock.now += 10
+    rejected = []
+
+    def trial():
+        # A concurrent call arriving during the trial is rejected
+        try:
+            breaker.call(succeed)
+        except DatabaseUnavailable:
+            rejected.append(True)
+        return "trial"
+
+    assert breaker.call(trial) == "trial"
+    assert rejected == [True]
+
+
+def test_errors_from_a_healthy_database_do_not_count(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+
+    def duplicate():
+        raise DuplicateKeyError("E11000 duplicate key error")
+
+    with pytest.raises(DuplicateKeyError):
+        breaker.call(duplicate)
+
+    assert not breaker.is_open
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+import mongomock
+import pytest
+from pymongo.errors import AutoReconnect
+from db.breaker import CircuitBreaker, DatabaseUnavailable
+from db.clicks import ClickCounter
+
+BUCKET = datetime(2026, 1, 1, tzinfo=timezone.utc)
+EXPIRES_AT = datetime(2026, 1, 3, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().db.click_stats
+    collection.create_index(
+        [("short_url", 1), ("granularity", 1), ("bucket", 1)], unique=True
+    )
+    return collection
+
+
+def make_counter(collection):
+    return ClickCounter(collection, CircuitBreaker(), deadline=5)
+
+
+def counts(collection):
+    return {
+        (rollup["short_url"], rollup["granularity"]): rollup["count"]
+        for rollup in collection.find()
+    }
+
+
+def test_clicks_are_aggregated_into_one_update_per_bucket(collection):
+    counter = make_counter(collection)
+    for _ in range(5):
+        counter.add(
+            [
+                ("abc", "minute", BUCKET, EXPIRES_AT),
+                ("abc", "day", BUCKET, None),
+            ]
+        )
+    counter.add([("xyz", "day", BUCKET, None)])
+
+    assert collection.count_documents({}) == 0
+    counter.flush()
+
+    assert counts(collection) == {
+        ("abc", "minute"): 5,
+        ("abc", "day"): 5,
+        ("xyz", "day"): 1,
+    }
+    minute = collection.find_one({"granularity": "minute"})
+    assert minute["expires_at"].replace(tzinfo=timezone.utc) == EXPIRES_AT
+    assert "expires_at" not in collection.find_one({"short_url": "xyz"})
+
+
+def test_flushes_add_to_existing_counts(collection):
+    counter = make_counter(collection)
+    counter.add([("abc", "day", BUCKET, None)])
+    counter.flush()
+    counter.add([("abc", "day", BUCKET, None)])
+    counter.flush()
+    counter.flush()
+
+    assert counts(collection) == {("abc", "day"): 2}
+
+
+def test_increments_are_kept_when_the_database_is_unavailable(collection):
+    counter = make_counter(collection)
+    counter.add([("abc", "day", BUCKET, None)])
+    bulk_write = collection.bulk_write
+
+    def unavailable(*args, **kwargs):
+        raise AutoReconnect("connection refused")
+
+    collection.bulk_write = unavailable
+    with pytest.raises(DatabaseUnavailable):
+        counter.flush()
+
+    counter.add([("abc", "day", BUCKET, None)])
+    collection.bulk_write = bulk_write
+    counter.flush()
+
+    assert counts(collection) == {("abc", "day"): 2}
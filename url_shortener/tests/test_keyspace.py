@@ -0,0 +1,85 @@
+import mongomock
+import pytest
+from api.encode import generate_short_url
+import db.models
+from db.keyspace import Keyspace
+
+
+@pytest.fixture
+def collections():
+    database = mongomock.MongoClient().db
+    return database.settings, database.urls
+
+
+def make_keyspace(collections, alphabet="ab", min_length=2, threshold=0.5):
+    settings, urls = collections
+    return Keyspace(settings, urls, alphabet, min_length, threshold)
+
+
+def test_length_grows_once_generated_codes_pass_the_threshold(collections):
+    keyspace = make_keyspace(collections)
+
+    # Two of the four codes of length 2 is exactly the threshold
+    for _ in range(2):
+        keyspace.record_encode(0, length=2)
+    keyspace.refresh()
+    assert keyspace.length == 2
+
+    keyspace.record_encode(0, length=2)
+    keyspace.refresh()
+    assert keyspace.length == 3
+
+
+def test_length_is_shared_and_never_shrinks(collections):
+    first = make_keyspace(collections)
+    for _ in range(3):
+        first.record_encode(0, length=2)
+    first.refresh()
+
+    second = make_keyspace(collections)
+    second.refresh()
+
+    assert second.length == 3
+
+
+def test_stored_codes_are_counted_after_publishing_own_encodes(collections):
+    _, urls = collections
+    urls.insert_many({"short_url": f"{n:08d}"} for n in range(1000))
+    keyspace = make_keyspace(collections, alphabet="0123456789", min_length=8)
+
+    # An encode published by the first successful refresh
+    keyspace.record_encode(0, length=8)
+    settings = keyspace.refresh()
+    assert settings["generated"] == {"8": 1000}
+
+    # Later refreshes only add new encodes
+    keyspace.record_encode(0, length=8)
+    assert keyspace.refresh()["generated"] == {"8": 1001}
+
+
+def test_failed_encode_wakes_the_refresher(collections):
+    keyspace = make_keyspace(collections)
+
+    keyspace.record_encode(10)
+
+    assert keyspace._wakeup.is_set()
+
+
+def test_generated_codes_use_the_length_and_alphabet():
+    codes = {generate_short_url("https://example.com", 12, "xyz") for _ in range(50)}
+
+    assert all(len(code) == 12 and set(code) <= set("xyz") for code in codes)
+    assert len(codes) > 1
+
+
+def test_encode_generates_codes_of_the_current_length(
+    client, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(db.models.keyspace, "_length", 11)
+
+    response = client.post(
+        "/api/encode", json={"long_url": "https://example.com"}, headers=auth_headers()
+    )
+
+    assert response.status_code == 201
+    assert len(response.get_json()["short_url"].rsplit("/", 1)[1]) == 11
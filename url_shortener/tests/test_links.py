@@ -0,0 +1,76 @@
+import pytest
+from bson import ObjectId
+import db.mappings
+from db.write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def write_behind(database, monkeypatch, tmp_path):
+    """
+    A started write-behind queue that never flushes during the test.
+    """
+    log_path = str(tmp_path / "wal.log")
+    queue = WriteBehindQueue(database.urls, log_path, flush_interval=60)
+    monkeypatch.setattr(db.mappings, "write_behind_queue", queue)
+    queue.start()
+    yield queue
+    queue.stop()
+
+
+def mapping(short_url, owner="alice"):
+    return {
+        "_id": ObjectId(),
+        "short_url": short_url,
+        "long_url": f"https://example.com/{short_url}",
+        "owner": owner,
+        "status": "ok",
+    }
+
+
+def list_all(client, headers, limit):
+    """
+    Follow the cursors from the first page to the last.
+    """
+    pages = []
+    url = f"/api/links?limit={limit}"
+    while True:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        pages.append([link["short_url"].rsplit("/", 1)[1] for link in body["links"]])
+        if body["next_cursor"] is None:
+            return pages
+        url = f"/api/links?limit={limit}&cursor={body['next_cursor']}"
+
+
+def test_pages_list_every_link_once_newest_first(client, auth_headers, database):
+    for n in range(5):
+        database.urls.insert_one(mapping(f"link{n}"))
+    database.urls.insert_one(mapping("bobs", owner="bob"))
+
+    pages = list_all(client, auth_headers(), limit=2)
+
+    assert pages == [["link4", "link3"], ["link2", "link1"], ["link0"]]
+
+
+def test_pages_include_pending_write_behind_mappings(
+    client, auth_headers, database, write_behind
+):
+    # Stored and buffered mappings interleave in creation order
+    for n in range(6):
+        document = mapping(f"link{n}")
+        if n % 2:
+            write_behind.enqueue(document)
+        else:
+            database.urls.insert_one(document)
+    write_behind.enqueue(mapping("bobs", owner="bob"))
+
+    pages = list_all(client, auth_headers(), limit=4)
+
+    assert pages == [["link5", "link4", "link3", "link2"], ["link1", "link0"]]
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers):
+    response = client.get("/api/links?cursor=nope", headers=auth_headers())
+
+    assert response.status_code == 400
@@ -0,0 +1,41 @@
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+import db.mappings
+import db.models
+import db.tokens
+
+
+class Unreachable:
+    """
+    A collection whose every read times out, as during a primary election.
+    """
+
+    def find_one(self, *args, **kwargs):
+        raise ServerSelectionTimeoutError("No primary available")
+
+
+@pytest.fixture
+def election(database, monkeypatch):
+    """
+    Make primary reads time out while secondaries still answer.
+    """
+    monkeypatch.setattr(db.mappings, "url_collection", Unreachable())
+    monkeypatch.setattr(db.mappings, "url_read_collection", database.urls)
+    monkeypatch.setattr(db.tokens, "revoked_token_read_collection", Unreachable())
+    for breaker in (db.models.database_breaker, db.models.primary_breaker):
+        monkeypatch.setattr(breaker, "_failures", 0)
+        monkeypatch.setattr(breaker, "_opened_at", None)
+
+
+def test_failing_primary_reads_do_not_block_decode_lookups(database, election):
+    database.urls.insert_one({"short_url": "abc", "long_url": "https://a.b"})
+    threshold = db.models.primary_breaker.failure_threshold
+
+    for _ in range(threshold):
+        with pytest.raises(db.DatabaseUnavailable):
+            db.find_owned_mapping("https://a.b", "alice")
+        db.is_token_revoked("some-jti")
+
+    assert db.models.primary_breaker.is_open
+    assert not db.models.database_breaker.is_open
+    assert db.lookup_short_url("abc")["long_url"] == "https://a.b"
@@ -0,0 +1,55 @@
+import mongomock
+import pytest
+import db.mappings
+from db.routing import RecentCodes
+
+
+@pytest.fixture
+def lagging_secondary(database, monkeypatch):
+    """
+    Route decode reads to a secondary that has not replicated anything yet.
+    """
+    secondary = mongomock.MongoClient().url_shortener.urls
+    monkeypatch.setattr(db.mappings, "url_read_collection", secondary)
+    monkeypatch.setattr(db.mappings, "recent_codes", RecentCodes(window=60))
+    return secondary
+
+
+def test_recent_code_missing_on_the_secondary_is_read_from_the_primary(
+    database, lagging_secondary
+):
+    db.mappings.store_mapping(
+        {"short_url": "fresh", "long_url": "https://a.b"}, write_behind=False
+    )
+
+    assert database.urls.count_documents({"short_url": "fresh"}) == 1
+    assert db.mappings.lookup_short_url("fresh")["long_url"] == "https://a.b"
+
+
+def test_old_code_missing_on_the_secondary_is_not_read_from_the_primary(
+    database, lagging_secondary
+):
+    database.urls.insert_one({"short_url": "old", "long_url": "https://a.b"})
+
+    assert db.mappings.lookup_short_url("old") is None
+
+
+def test_recent_codes_expire_after_the_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("db.routing.time.monotonic", lambda: now[0])
+    codes = RecentCodes(window=90)
+    codes.add("abc")
+
+    now[0] += 89
+    assert "abc" in codes
+    now[0] += 2
+    assert "abc" not in codes
+
+
+def test_recent_codes_forget_the_oldest_beyond_max_size():
+    codes = RecentCodes(window=90, max_size=2)
+    for short_url in ("a", "b", "c"):
+        codes.add(short_url)
+
+    assert "a" not in codes
+    assert "b" in codes and "c" in codes
@@ -0,0 +1,91 @@
+import os
+import struct
+from db.snapshot import HEADER, MAGIC, OFFSET, LocalSnapshot, write_snapshot
+
+MAPPINGS = sorted(
+    [(f"code{i:04d}", f"https://example.com/{i}") for i in range(500)]
+    + [("ünï", "https://example.com/ünïcode")]
+)
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+
+    assert write_snapshot(path, MAPPINGS) == len(MAPPINGS)
+
+    snapshot = LocalSnapshot(path)
+    for short_url, long_url in MAPPINGS[::37] + MAPPINGS[-1:]:
+        assert snapshot.lookup(short_url) == long_url
+    assert snapshot.lookup("ünï") == "https://example.com/ünïcode"
+    assert snapshot.lookup("code0000x") is None
+    assert snapshot.lookup("") is None
+
+
+def test_snapshot_layout(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, [("a", "https://a"), ("b", "https://bb")])
+
+    with open(path, "rb") as snapshot:
+        data = snapshot.read()
+
+    magic, count, table_offset = HEADER.unpack_from(data, 0)
+    assert (magic, count) == (MAGIC, 2)
+    # The offset table ends the file, one little-endian entry per record
+    assert table_offset + count * OFFSET.size == len(data)
+    (first,) = OFFSET.unpack_from(data, table_offset)
+    assert first == HEADER.size
+    assert struct.unpack_from("<HI", data, first) == (1, 9)
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, [])
+
+    assert LocalSnapshot(path).lookup("anything") is None
+
+
+def test_missing_snapshot(tmp_path):
+    assert LocalSnapshot(str(tmp_path / "missing.bin")).lookup("code") is None
+
+
+def test_snapshot_is_reloaded_when_replaced(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, [("old", "https://old")])
+    snapshot = LocalSnapshot(path, check_interval=0)
+    assert snapshot.lookup("old") == "https://old"
+
+    write_snapshot(path, [("new", "https://new")])
+
+    assert snapshot.lookup("new") == "https://new"
+    assert snapshot.lookup("old") is None
+
+
+def test_write_leaves_no_temporary_files(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, MAPPINGS)
+    write_snapshot(path, MAPPINGS)
+
+    assert os.listdir(tmp_path) == ["snapshot.bin"]
+
+
+def test_truncated_snapshot_is_ignored(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, MAPPINGS)
+    with open(path, "r+b") as snapshot:
+        snapshot.truncate(os.path.getsize(path) - 1)
+
+    assert LocalSnapshot(path).lookup(MAPPINGS[0][0]) is None
+
+
+def test_corrupt_offsets_are_treated_as_misses(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, MAPPINGS)
+    with open(path, "r+b") as snapshot:
+        data = bytearray(snapshot.read())
+        _, count, table_offset = HEADER.unpack_from(data, 0)
+        for index in range(count):
+            OFFSET.pack_into(data, table_offset + index * OFFSET.size, 2**40)
+        snapshot.seek(0)
+        snapshot.write(data)
+
+    assert LocalSnapshot(path).lookup(MAPPINGS[0][0]) is None
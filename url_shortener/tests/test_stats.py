@@ -0,0 +1,30 @@
+import api.stats
+from db import DatabaseUnavailable
+
+
+def stats(client, headers, short_url="abc"):
+    return client.get(f"/api/links/{short_url}/stats?granularity=day", headers=headers)
+
+
+def test_owner_sees_the_stats_of_a_link(client, auth_headers, database):
+    database.urls.insert_one(
+        {"short_url": "abc", "long_url": "https://a.b", "owner": "alice"}
+    )
+
+    response = stats(client, auth_headers())
+
+    assert response.status_code == 200
+    assert response.get_json()["total"] == 0
+    assert stats(client, auth_headers("bob")).status_code == 404
+
+
+def test_unavailable_database_is_reported_as_503(client, auth_headers, monkeypatch):
+    def find_mapping(field, value):
+        raise DatabaseUnavailable("Circuit breaker is open")
+
+    monkeypatch.setattr(api.stats, "find_mapping", find_mapping)
+
+    response = stats(client, auth_headers())
+
+    assert response.status_code == 503
+    assert response.get_json() == {"error": "Service temporarily unavailable"}
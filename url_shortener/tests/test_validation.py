@@ -0,0 +1,221 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import socket
+import threading
+import time
+import pytest
+from api.validation import (
+    STATUS_BLOCKED,
+    STATUS_BROKEN,
+    STATUS_OK,
+    STATUS_UNREACHABLE,
+    ValidationPipeline,
+    normalize_url,
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answer HEAD and GET requests with the status code named by the path.
+
+    Paths starting with /nohead reject HEAD with 405 (Method Not Allowed), and
+    paths starting with /slow answer 200 after half a second.
+    """
+
+    requests = []
+
+    def do_HEAD(self):
+        self.requests.append(("HEAD", self.path))
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+            self.answer(200)
+        elif self.path.startswith("/nohead"):
+            self.answer(405)
+        else:
+            self.answer(int(self.path.strip("/").split("?")[0] or 200))
+
+    def do_GET(self):
+        self.requests.append(("GET", self.path))
+        self.answer(200)
+
+    def answer(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    StubHandler.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pipeline():
+    results = {}
+    done = threading.Condition()
+
+    def on_result(short_url, fields):
+        with done:
+            results[short_url] = fields
+            done.notify_all()
+
+    pipeline = ValidationPipeline(on_result, allow_private=True, timeout=5)
+    pipeline.results = results
+
+    def wait_for(short_url):
+        with done:
+            assert done.wait_for(lambda: short_url in results, timeout=5)
+        return results[short_url]
+
+    pipeline.wait_for = wait_for
+    yield pipeline
+    pipeline.stop()
+
+
+def probe(pipeline, url):
+    future = asyncio.run_coroutine_threadsafe(pipeline.probe(url), pipeline._loop)
+    return future.result()
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_reachable_url_is_ok(pipeline, stub_server):
+    pipeline.start()
+
+    assert probe(pipeline, f"{stub_server}/200?q=1") == {
+        "status": STATUS_OK,
+        "http_status": 200,
+    }
+    assert StubHandler.requests == [("HEAD", "/200?q=1")]
+
+
+def test_error_response_is_broken(pipeline, stub_server):
+    pipeline.start()
+
+    assert probe(pipeline, f"{stub_server}/404") == {
+        "status": STATUS_BROKEN,
+        "http_status": 404,
+    }
+
+
+def test_rejected_head_falls_back_to_get(pipeline, stub_server):
+    pipeline.start()
+
+    assert probe(pipeline, f"{stub_server}/nohead")["status"] == STATUS_OK
+    assert StubHandler.requests == [("HEAD", "/nohead"), ("GET", "/nohead")]
+
+
+def test_closed_port_is_unreachable(pipeline):
+    pipeline.start()
+
+    result = probe(pipeline, f"http://127.0.0.1:{closed_port()}/")
+
+    assert result == {"status": STATUS_UNREACHABLE, "http_status": None}
+
+
+def test_private_addresses_are_blocked_by_default(stub_server):
+    pipeline = ValidationPipeline(lambda *args: None, timeout=2)
+    pipeline.start()
+    try:
+        assert probe(pipeline, f"{stub_server}/200")["status"] == STATUS_BLOCKED
+        assert StubHandler.requests == []
+    finally:
+        pipeline.stop()
+
+
+def test_submitted_urls_are_reported_with_a_timestamp(pipeline, stub_server):
+    pipeline.start()
+
+    pipeline.submit("abc", f"{stub_server}/200")
+
+    result = pipeline.wait_for("abc")
+    assert result["status"] == STATUS_OK
+    assert result["checked_at"] is not None
+
+
+def test_urls_submitted_before_start_are_probed_once_started(pipeline, stub_server):
+    pipeline.submit("early", f"{stub_server}/200")
+    assert pipeline.results == {}
+
+    pipeline.start()
+
+    assert pipeline.wait_for("early")["status"] == STATUS_OK
+
+
+def test_burst_to_one_host_does_not_hold_up_other_hosts(stub_server):
+    port = stub_server.rsplit(":", 1)[1]
+    other_done = threading.Event()
+    results = []
+
+    def on_result(short_url, fields):
+        results.append(short_url)
+        if short_url == "other":
+            other_done.set()
+
+    # Slots for two probes, but only one per host
+    pipeline = ValidationPipeline(
+        on_result, concurrency=2, per_host=1, allow_private=True
+    )
+    pipeline.start()
+    try:
+        for n in range(4):
+            pipeline.submit(f"slow{n}", f"{stub_server}/slow{n}")
+        pipeline.submit("other", f"http://localhost:{port}/200")
+
+        # The other host's probe runs alongside the first slow probe
+        assert other_done.wait(timeout=5)
+        assert results[0] == "other"
+    finally:
+        pipeline.stop()
+
+
+def test_queue_size_bounds_the_waiting_urls(stub_server):
+    results = []
+    pipeline = ValidationPipeline(
+        lambda short_url, fields: results.append(short_url),
+        per_host=1,
+        queue_size=2,
+        allow_private=True,
+    )
+    pipeline.start()
+    try:
+        # One probe in flight, two waiting, and the rest dropped
+        for n in range(5):
+            pipeline.submit(f"slow{n}", f"{stub_server}/slow{n}")
+        time.sleep(2)
+        assert sorted(results) == ["slow0", "slow1", "slow2"]
+    finally:
+        pipeline.stop()
+
+
+@pytest.mark.parametrize(
+    "url, normalized",
+    [
+        ("HTTPS://Example.COM:443/Path?q=1", "https://example.com/Path?q=1"),
+        ("http://example.com:8080/", "http://example.com:8080/"),
+        ("http://bücher.example/", "http://xn--bcher-kva.example/"),
+    ],
+)
+def test_normalize_url(url, normalized):
+    assert normalize_url(url) == normalized
+
+
+@pytest.mark.parametrize(
+    "url", ["ftp://example.com/", "http://", "http://exa mple.com/", "http://x:99999/"]
+)
+def test_normalize_url_rejects_invalid_urls(url):
+    with pytest.raises(ValueError):
+        normalize_url(url)
@@ -0,0 +1,241 @@
+import os
+import threading
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+from db.write_behind import WriteBehindQueue, lock_log
+
+
+def mapping(short_url, long_url=None, **fields):
+    return {
+        "_id": ObjectId(),
+        "short_url": short_url,
+        "long_url": long_url or f"https://example.com/{short_url}",
+        "owner": "alice",
+        **fields,
+    }
+
+
+def write_log(path, documents, torn=False):
+    with open(path, "w", encoding="utf-8") as log:
+        for document in documents:
+            log.write(json_util.dumps(document) + "\n")
+        if torn:
+            log.write('{"_id": {"$oid": "')
+
+
+def read_log(path):
+    with open(path, encoding="utf-8") as log:
+        return [json_util.loads(line) for line in log if line.strip()]
+
+
+def make_queue(collection, tmp_path):
+    return WriteBehindQueue(collection, str(tmp_path / "wal.log"), flush_interval=60)
+
+
+def test_enqueued_mapping_is_logged_and_served_before_flush(url_collection, tmp_path):
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+    document = mapping("abc12345")
+
+    queue.enqueue(document)
+
+    assert queue.find_by_short_url("abc12345") == document
+    assert queue.find_by_long_url(document["long_url"], "alice") == document
+    assert read_log(queue.log_path) == [document]
+    assert url_collection.count_documents({}) == 0
+    queue.stop()
+
+
+def test_flush_inserts_pending_mappings_and_compacts_the_log(url_collection, tmp_path):
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+    for short_url in ("aaa", "bbb", "ccc"):
+        queue.enqueue(mapping(short_url))
+
+    queue.flush()
+
+    assert url_collection.count_documents({}) == 3
+    assert queue.pending_mappings() == []
+    assert read_log(queue.log_path) == []
+
+    queue.enqueue(mapping("ddd"))
+    assert [document["short_url"] for document in read_log(queue.log_path)] == ["ddd"]
+    queue.stop()
+
+
+def test_stop_drains_pending_mappings_and_removes_the_log(url_collection, tmp_path):
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+    queue.enqueue(mapping("aaa"))
+    log_path = queue.log_path
+
+    queue.stop()
+
+    assert url_collection.count_documents({"short_url": "aaa"}) == 1
+    assert not os.path.exists(log_path)
+    assert not os.path.exists(log_path + ".lock")
+
+
+def test_start_adopts_logs_of_dead_processes(url_collection, tmp_path):
+    base_path = str(tmp_path / "wal.log")
+    orphan = mapping("orphan")
+    legacy = mapping("legacy")
+    write_log(f"{base_path}.999999", [orphan], torn=True)
+    write_log(base_path, [legacy])
+
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+
+    # Adopted mappings are served and moved into this process's log
+    assert queue.find_by_short_url("orphan") == orphan
+    assert {d["short_url"] for d in read_log(queue.log_path)} == {"orphan", "legacy"}
+    assert not os.path.exists(f"{base_path}.999999")
+    assert not os.path.exists(base_path)
+
+    queue.flush()
+    assert url_collection.count_documents({}) == 2
+    queue.stop()
+
+
+def test_start_leaves_logs_of_live_processes_alone(url_collection, tmp_path):
+    live_path = str(tmp_path / "wal.log.999999")
+    write_log(live_path, [mapping("live")])
+    live_lock = lock_log(live_path)
+
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+    queue.flush()
+
+    assert queue.find_by_short_url("live") is None
+    assert [d["short_url"] for d in read_log(live_path)] == ["live"]
+    assert url_collection.count_documents({}) == 0
+    queue.stop()
+    live_lock.close()
+
+
+def test_replayed_mappings_already_stored_are_not_duplicated(url_collection, tmp_path):
+    document = mapping("abc")
+    url_collection.insert_one(dict(document))
+    write_log(str(tmp_path / "wal.log.999999"), [document])
+
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+    queue.flush()
+
+    assert url_collection.count_documents({}) == 1
+    assert queue.pending_mappings() == []
+    queue.stop()
+
+
+def test_short_url_taken_by_another_long_url_is_kept_as_a_conflict(
+    url_collection, tmp_path
+):
+    url_collection.insert_one(mapping("abc", "https://other.example"))
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+    mine = mapping("abc", "https://mine.example")
+    queue.enqueue(mine)
+
+    queue.flush()
+    queue.flush()
+
+    assert queue.find_by_short_url("abc") == mine
+    assert queue.conflicts() == [mine]
+    assert read_log(queue.log_path) == [mine]
+    assert url_collection.find_one({"short_url": "abc"})["long_url"] == (
+        "https://other.example"
+    )
+    queue.stop()
+
+
+def test_status_update_racing_a_flush_reaches_the_database(url_collection, tmp_path):
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+    document = mapping("abc", status="pending")
+    queue.enqueue(document)
+
+    # The update lands after the flusher inserted the old copy
+    insert = queue._insert
+
+    def insert_then_update(documents):
+        result = insert(documents)
+        queue.update_pending("abc", {"status": "ok"})
+        return result
+
+    queue._insert = insert_then_update
+    queue.flush()
+    queue._insert = insert
+
+    # The copy being flushed is never mutated
+    assert document["status"] == "pending"
+
+    queue.flush()
+    assert url_collection.find_one({"short_url": "abc"})["status"] == "ok"
+    assert queue.pending_mappings() == []
+    queue.stop()
+
+
+class RejectingCollection:
+    """
+    Wraps a collection, failing the inserts of one short URL with a write error.
+    """
+
+    def __init__(self, collection, short_url):
+        self.collection = collection
+        self.short_url = short_url
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def insert_many(self, documents, ordered=True):
+        errors = []
+        for index, document in enumerate(documents):
+            if document["short_url"] == self.short_url:
+                errors.append({"index": index, "code": 121, "errmsg": "invalid"})
+            else:
+                self.collection.insert_one(document)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def test_rejected_mapping_is_set_aside_without_blocking_the_batch(
+    url_collection, tmp_path
+):
+    collection = RejectingCollection(url_collection, "bad")
+    queue = make_queue(collection, tmp_path)
+    queue.start()
+    bad = mapping("bad")
+    for document in (mapping("aaa"), bad, mapping("bbb")):
+        queue.enqueue(document)
+
+    queue.flush()
+
+    assert url_collection.count_documents({}) == 2
+    assert queue.pending_mappings() == [bad]
+    assert queue.rejected() == [bad]
+    assert read_log(queue.log_path) == [bad]
+
+    # Later flushes no longer resend it
+    url_collection.delete_many({})
+    queue.flush()
+    assert url_collection.count_documents({}) == 0
+    queue.stop()
+
+
+def test_lookups_do_not_wait_for_log_writes(url_collection, tmp_path):
+    queue = make_queue(url_collection, tmp_path)
+    queue.start()
+    document = mapping("abc")
+    queue.enqueue(document)
+    found = []
+
+    # Hold the log as an append or compaction in progress would
+    with queue._append_lock:
+        lookup = threading.Thread(
+            target=lambda: found.append(queue.find_by_short_url("abc"))
+        )
+        lookup.start()
+        lookup.join(timeout=5)
+
+    assert found == [document]
+    queue.stop()
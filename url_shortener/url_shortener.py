@@ -1,6 +1,6 @@
-import requests
 import sys
 from pymongo import MongoClient
+from shortener_client import ClientError, ShortenerClient
 
 # MongoDB connection settings
 MONGODB_URI = "mongodb://localhost:27017/"
@@ -8,6 +8,9 @@ MONGODB_URI = "mongodb://localhost:27017/"
 # Define the URL of the Flask server
 flask_url = "http://localhost:5000"
 
+# Client reusing one connection to the Flask server across menu operations
+client = ShortenerClient(flask_url)
+
 
 def signup(username, password):
     """
@@ -26,21 +29,15 @@ def signup(username, password):
     - Exception: If an unexpected error occurs during the signup process.
     """
     try:
-        # Send a POST request to the /auth/signup endpoint
-        response = requests.post(
-            f"{flask_url}/auth/signup",
-            json={"username": username, "password": password},
-        )
-
-        # Check if the request was successful
-        if response.status_code == 201:
-            print("Signup successful! Logging in...")
-            # Extract and return the JWT token from the response
-            return response.json().get("access_token")
-        else:
-            # Print error message if request was not successful
-            print("Error:", response.text)
-            return None
+        # Register the user; the client keeps the credentials for later logins
+        jwt_token = client.signup(username, password)
+        print("Signup successful! Logging in...")
+        return jwt_token
+
+    except ClientError as e:
+        # Print error message if request was not successful
+        print("Error:", e.message)
+        return None
 
     except Exception as e:
         print("An error occurred:", str(e))
@@ -64,19 +61,13 @@ def login(username, password):
     - Exception: If an unexpected error occurs during the login process.
     """
     try:
-        # Send a POST request to the /auth/login endpoint
-        response = requests.post(
-            f"{flask_url}/auth/login", json={"username": username, "password": password}
-        )
-
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Extract and return the JWT token from the response
-            return response.json().get("access_token")
-        else:
-            # Print error message if request was not successful
-            print("Error:", response.text)
-            return None
+        # Log in; the client keeps the credentials to refresh expired tokens
+        return client.login(username, password)
+
+    except ClientError as e:
+        # Print error message if request was not successful
+        print("Error:", e.message)
+        return None
 
     except Exception as e:
         print("An error occurred:", str(e))
@@ -98,18 +89,16 @@ def logout(jwt_token):
     - Exception: If an unexpected error occurs during the logout process.
     """
     try:
-        # Send a POST request to the /auth/logout endpoint with the JWT token in the headers
-        headers = {"Authorization": f"Bearer {jwt_token}"}
-        response = requests.post(f"{flask_url}/auth/logout", headers=headers)
-
-        # Check if the request was successful
-        if response.status_code == 200:
-            print("Logout successful!")
-            return True
-        else:
-            # Print error message if request was not successful
-            print("Error:", response.text)
-            return False
+        # Revoke the JWT token on the /auth/logout endpoint
+        client.token = jwt_token
+        client.logout()
+        print("Logout successful!")
+        return True
+
+    except ClientError as e:
+        # Print error message if request was not successful
+        print("Error:", e.message)
+        return False
 
     except Exception as e:
         print("An error occurred:", str(e))
@@ -133,20 +122,14 @@ def shorten_url(long_url, jwt_token):
     - Exception: If an unexpected error occurs during the encoding process.
     """
     try:
-        # Send a POST request to the /api/encode endpoint with JWT token in the headers
-        headers = {"Authorization": f"Bearer {jwt_token}"}
-        response = requests.post(
-            f"{flask_url}/api/encode", json={"long_url": long_url}, headers=headers
-        )
-
-        # Check if the request was successful (status code 201 or 200)
-        if response.status_code == 201 or response.status_code == 200:
-            # Extract and return the shortened URL from the response
-            return response.json().get("short_url")
-        else:
-            # Print error message if request was not successful
-            print("Error:", response.text)
-            return None
+        # Encode the URL on the /api/encode endpoint with the JWT token
+        client.token = jwt_token
+        return client.shorten(long_url)
+
+    except ClientError as e:
+        # Print error message if request was not successful
+        print("Error:", e.message)
+        return None
 
     except Exception as e:
         print("An error occurred:", str(e))
@@ -170,20 +153,15 @@ def expand_url(short_url, jwt_token):
     - Exception: If an unexpected error occurs during the decoding process.
     """
     try:
-        # Send a POST request to the /api/decode endpoint
-        headers = {"Authorization": f"Bearer {jwt_token}"}
-        response = requests.post(
-            f"{flask_url}/api/decode", json={"short_url": short_url}, headers=headers
-        )
-
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Extract and return the original URL from the response
-            return response.json().get("long_url")
-        else:
-            # Print error message if request was not successful
-            print("Error:", response.text)
-            return None
+        # Decode the URL on the /api/decode endpoint with the JWT token
+        client.token = jwt_token
+        return client.expand(short_url)
+
+    except ClientError as e:
+        # Print error message if request was not successful
+        print("Error:", e.message)
+        return None
+
     except Exception as e:
         print("An error occurred:", str(e))
         return None